@@ -7,8 +7,13 @@ from models.user import User
 from datetime import datetime
 from flask_pymongo import PyMongo
 from backend.api import api_bp
+from utils.ocr_engine import DEFAULT_POOL_SIZE, get_ocr_engine
+from model_server import get_model_server
+from utils.indexes import ensure_indexes, install_slow_query_listener
+from utils.mongo_pool import get_database
 import os
 import logging
+import threading
 from bson.objectid import ObjectId
 
 app = Flask(__name__)
@@ -17,6 +22,16 @@ app.config['MONGO_URI'] = 'mongodb://localhost:27017/monitoring'
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
 # Increase max content length to 500MB
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
+# Number of EasyOCR readers shared by all video processing threads
+app.config['OCR_POOL_SIZE'] = DEFAULT_POOL_SIZE
+# Worker processes for sharded processing of long videos (1 disables sharding)
+app.config['VIDEO_SHARD_WORKERS'] = int(os.environ.get('VIDEO_SHARD_WORKERS', 1))
+# Videos processed at the same time, and uploads allowed to wait for a worker
+app.config['VIDEO_JOB_WORKERS'] = int(os.environ.get('VIDEO_JOB_WORKERS', 1))
+app.config['VIDEO_JOB_QUEUE_SIZE'] = int(os.environ.get('VIDEO_JOB_QUEUE_SIZE', 10))
+
+# Queries slower than this are reported, flagged when no index serves them
+app.config['SLOW_QUERY_MS'] = int(os.environ.get('SLOW_QUERY_MS', 100))
 
 # Configure logging
 log = logging.getLogger('werkzeug')
@@ -26,7 +41,8 @@ log.setLevel(logging.ERROR)
 app.logger.disabled = True
 log.disabled = True
 
-# Initialize MongoDB
+# Initialize MongoDB; the listener must exist before the clients are created
+install_slow_query_listener(app.config['SLOW_QUERY_MS'])
 mongo = PyMongo(app)
 
 # Initialize Login Manager
@@ -55,7 +71,29 @@ from routes import *
 # After app configurations
 init_db(app)
 
+
+def start_services():
+    """Start the background services of the web server.
+
+    Call it once, from the process serving the app, after routes has been
+    fully imported: `python app.py` runs this file as __main__ and routes
+    imports it again as `app`, so nothing here may run at import time.
+    """
+    from routes import resume_video_jobs
+
+    # Load and warm up the shared OCR readers without blocking startup
+    threading.Thread(target=get_ocr_engine(app.config['OCR_POOL_SIZE']).warm_up, daemon=True).start()
+    # The server process loads the YOLO models in the background
+    get_model_server()
+    # Pick up the uploads that were queued or running when the server stopped
+    resume_video_jobs()
+    # Create and verify the indexes the queries need, including the
+    # collection the violation sink writes to
+    ensure_indexes(mongo.db)
+    ensure_indexes(get_database('traffic_monitoring'), collections=['violations'])
+
+
 if __name__ == '__main__':
+    start_services()
     print('\nServer is running at: http://localhost:5000')
     app.run(host='0.0.0.0', port=5000, debug=False)
-    
\ No newline at end of file
@@ -0,0 +1,123 @@
+import csv
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+
+# Columns of an exported report, in order
+EXPORT_FIELDS = ['_id', 'timestamp', 'license_plate', 'speed', 'image_path']
+EXPORT_BATCH_SIZE = 5000  # Violations per cursor batch, CSV chunk and Parquet row group
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def parquet_available():
+    return pa is not None
+
+
+def violation_batches(collection, start_dt, end_dt, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the violations of a date range as lists of rows, oldest first.
+
+    Only the exported fields are fetched, and the cursor brings them back
+    batch_size at a time, so a batch is all that is held in memory.
+    """
+    cursor = collection.find(
+        {'timestamp': {'$gte': start_dt, '$lt': end_dt}},
+        {field: 1 for field in EXPORT_FIELDS}
+    ).sort('timestamp', 1).batch_size(batch_size)
+
+    batch = []
+    for violation in cursor:
+        batch.append([violation.get(field) for field in EXPORT_FIELDS])
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _format_row(row):
+    values = dict(zip(EXPORT_FIELDS, row))
+    values['_id'] = str(values['_id'])
+    if values['timestamp'] is not None:
+        values['timestamp'] = values['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+    return [values[field] for field in EXPORT_FIELDS]
+
+
+def csv_chunks(batches):
+    """Encode row batches as CSV, one chunk of bytes per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        writer.writerows(_format_row(row) for row in batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty report
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file handing the bytes written so far to the response."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_chunks(batches):
+    """Encode row batches as a Parquet file, one row group per batch."""
+    schema = pa.schema([
+        ('_id', pa.string()),
+        ('timestamp', pa.timestamp('ms')),
+        ('license_plate', pa.string()),
+        ('speed', pa.float64()),
+        ('image_path', pa.string())
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            columns = list(zip(*batch))
+            columns[0] = [str(value) for value in columns[0]]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def export_chunks(collection, start_dt, end_dt, export_format='csv'):
+    """Stream the violations of a date range as CSV or Parquet bytes."""
+    batches = violation_batches(collection, start_dt, end_dt)
+    if export_format == 'parquet':
+        return parquet_chunks(batches)
+    return csv_chunks(batches)
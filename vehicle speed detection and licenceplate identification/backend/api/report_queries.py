@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from utils.rollups import rollup_days
+
+
+def parse_date_range(start_date, end_date):
+    """Turn YYYY-MM-DD start and end dates into a [start, end) datetime range."""
+    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+    end_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+    return start_dt, end_dt
+
+
+def peak_hours(hours, top=3):
+    """The busiest hours of a rollup day, as 'HH:00' labels."""
+    busiest = sorted((hour for hour, stats in hours.items() if stats.get('count', 0) > 0),
+                     key=lambda hour: (-hours[hour]['count'], hour))
+    return ', '.join(f"{hour}:00" for hour in busiest[:top]) or 'N/A'
+
+
+def violation_summary(start_dt, end_dt, rollups=None):
+    """Per-day violation counts, average speeds and peak hours of a date range.
+
+    Read from the daily rollups: one small document per day of the range,
+    however many violations it holds. The days still open are rebuilt from
+    the violations collection first.
+    """
+    response_data = {
+        'dates': [],
+        'violations': [],
+        'speeds': [],
+        'details': []
+    }
+
+    for day in rollup_days(start_dt, end_dt, rollups):
+        if day.get('count', 0) <= 0:
+            continue
+        avg_speed = round(day['speed_sum'] / day['count'], 2)
+        response_data['dates'].append(day['_id'])
+        response_data['violations'].append(day['count'])
+        response_data['speeds'].append(avg_speed)
+        response_data['details'].append({
+            'date': day['_id'],
+            'total_violations': day['count'],
+            'avg_speed': avg_speed,
+            'peak_hours': peak_hours(day.get('hours', {}))
+        })
+
+    return response_data
@@ -27,6 +27,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Shared by all requests; the model uses the process-wide MongoDB client
+vehicle_db = VehicleDetection()
+
 # Basic health check endpoint
 @app.get("/")
 async def root():
@@ -56,8 +59,7 @@ async def record_detection(plate_number: str, speed: float, image: UploadFile =
             buffer.write(await image.read())
         
         # Record in database
-        vehicle_detection = VehicleDetection()
-        detection_id = vehicle_detection.insert_detection(
+        detection_id = vehicle_db.insert_detection(
             plate_number=plate_number,
             speed=speed,
             image_path=image_path
@@ -72,7 +74,7 @@ async def record_detection(plate_number: str, speed: float, image: UploadFile =
                 'image_path': image_path,
                 'status': 'pending'
             }
-            vehicle_detection.collection.insert_one(violation_data)
+            vehicle_db.collection.insert_one(violation_data)
         
         return {"status": "success", "detection_id": str(detection_id)}
     except Exception as e:
@@ -81,8 +83,7 @@ async def record_detection(plate_number: str, speed: float, image: UploadFile =
 @app.get("/api/violations")
 async def get_violations(start_date: str = None, end_date: str = None):
     try:
-        vehicle_detection = VehicleDetection()
-        violations = vehicle_detection.get_violations(
+        violations = vehicle_db.get_violations(
             start_date=datetime.fromisoformat(start_date) if start_date else None,
             end_date=datetime.fromisoformat(end_date) if end_date else None
         )
@@ -1,10 +1,10 @@
-from pymongo import MongoClient
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from utils.mongo_pool import get_client
 
 class User:
     def __init__(self):
-        self.client = MongoClient('mongodb://localhost:27017/')
+        self.client = get_client()
         self.db = self.client['monitoring']
         self.collection = self.db['users']
 
@@ -1,10 +1,10 @@
 from datetime import datetime
-from pymongo import MongoClient
 from bson import ObjectId
+from utils.mongo_pool import get_client
 
 class VehicleDetection:
     def __init__(self):
-        self.client = MongoClient('mongodb://localhost:27017/')
+        self.client = get_client()
         self.db = self.client['monitoring']
         self.collection = self.db['detections']
 
@@ -0,0 +1,16 @@
+from utils.rollups import ROLLUP_DATABASE, backfill_rollups
+
+
+def main():
+    # Rebuild the rollups from the violations listed on /violations
+    try:
+        total = backfill_rollups()
+        print(f'Rebuilt violation rollups from {total} violations in {ROLLUP_DATABASE}.violations')
+        return True
+    except Exception as e:
+        print(f'Error rebuilding violation rollups: {str(e)}')
+        return False
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from tracker import Tracker
+
+TRACK_COUNTS = (10, 100, 1000)
+
+
+class LegacyKalmanFilter(object):
+    """The KalmanFilter of the original tracker, unchanged: two rounded
+    states and a fixed dt."""
+
+    def __init__(self):
+        self.dt = 0.005  # delta time
+
+        self.A = np.array([[1, 0], [0, 1]])  # matrix in observation equations
+        self.u = np.zeros((2, 1))  # previous state vector
+        self.b = np.array([[0], [255]])  # vector of observations
+        self.P = np.diag((3.0, 3.0))  # covariance matrix
+        self.F = np.array([[1.0, self.dt], [0.0, 1.0]])  # state transition mat
+        self.Q = np.eye(self.u.shape[0])  # process noise matrix
+        self.R = np.eye(self.b.shape[0])  # observation noise matrix
+        self.lastResult = np.array([[0], [255]])
+
+    def predict(self):
+        self.u = np.round(np.dot(self.F, self.u))
+        self.P = np.dot(self.F, np.dot(self.P, self.F.T)) + self.Q
+        self.lastResult = self.u
+        return self.u
+
+    def correct(self, b, flag):
+        if not flag:  # update using prediction
+            self.b = self.lastResult
+        else:  # update using detection
+            self.b = b
+        C = np.dot(self.A, np.dot(self.P, self.A.T)) + self.R
+        K = np.dot(self.P, np.dot(self.A.T, np.linalg.inv(C)))
+
+        self.u = np.round(self.u + np.dot(K, (self.b - np.dot(self.A, self.u))))
+        self.P = self.P - np.dot(K, np.dot(C, K.T))
+        self.lastResult = self.u
+        return self.u
+
+
+class LegacyTrack(object):
+    """The original Track, unchanged."""
+
+    def __init__(self, prediction, trackIdCount):
+        self.track_id = trackIdCount
+        self.KF = LegacyKalmanFilter()
+        self.prediction = np.asarray(prediction)
+        self.skipped_frames = 0
+        self.trace = []
+        self.start_time = datetime.utcnow()
+        self.passed = False
+
+
+class LegacyTracker(object):
+    """The original Tracker, kept as the baseline: the code below is the
+    update() this repo shipped before the tracker was batched, bugs
+    included (with numpy 2 every cost cell fails its try and stays 0, and
+    deleting stale tracks by index can skip or misdelete tracks). Only the
+    comments are trimmed."""
+
+    def __init__(self, dist_thresh, max_frames_to_skip, max_trace_length,
+                 trackIdCount):
+        self.dist_thresh = dist_thresh
+        self.max_frames_to_skip = max_frames_to_skip
+        self.max_trace_length = max_trace_length
+        self.tracks = []
+        self.trackIdCount = trackIdCount
+
+    def update(self, detections):
+        if len(self.tracks) == 0:
+            for i in range(len(detections)):
+                track = LegacyTrack(detections[i], self.trackIdCount)
+                self.trackIdCount += 1
+                self.tracks.append(track)
+
+        N = len(self.tracks)
+        M = len(detections)
+        cost = np.zeros(shape=(N, M))
+        for i in range(len(self.tracks)):
+            for j in range(len(detections)):
+                try:
+                    diff = self.tracks[i].prediction - detections[j]
+                    distance = np.sqrt(diff[0]*diff[0] +
+                                       diff[1]*diff[1])
+                    cost[i][j] = distance
+                except:
+                    pass
+
+        cost = (0.5) * cost
+        assignment = [-1 for _ in range(N)]
+        row_ind, col_ind = linear_sum_assignment(cost)
+        for i in range(len(row_ind)):
+            assignment[row_ind[i]] = col_ind[i]
+
+        un_assigned_tracks = []
+        for i in range(len(assignment)):
+            if assignment[i] != -1:
+                if cost[i][assignment[i]] > self.dist_thresh:
+                    assignment[i] = -1
+                    un_assigned_tracks.append(i)
+                pass
+            else:
+                self.tracks[i].skipped_frames += 1
+
+        del_tracks = [i for i in range(len(self.tracks)) if self.tracks[i].skipped_frames > self.max_frames_to_skip]
+
+        if len(del_tracks) > 0:
+            for id in del_tracks:
+                if id < len(self.tracks):
+                    del self.tracks[id]
+                    del assignment[id]
+                else:
+                    print("ERROR: id is greater than length of tracks")
+
+        un_assigned_detects = [i for i in range(len(detections)) if i not in assignment]
+
+        if len(un_assigned_detects) != 0:
+            for i in range(len(un_assigned_detects)):
+                track = LegacyTrack(detections[un_assigned_detects[i]],
+                                    self.trackIdCount)
+                self.trackIdCount += 1
+                self.tracks.append(track)
+
+        for i in range(len(assignment)):
+            self.tracks[i].KF.predict()
+
+            if assignment[i] != -1:
+                self.tracks[i].skipped_frames = 0
+                self.tracks[i].prediction = self.tracks[i].KF.correct(
+                                            detections[assignment[i]], 1)
+            else:
+                self.tracks[i].prediction = self.tracks[i].KF.correct(
+                                            np.array([[0], [0]]), 0)
+
+            if len(self.tracks[i].trace) > self.max_trace_length:
+                for j in range(len(self.tracks[i].trace) -
+                               self.max_trace_length):
+                    del self.tracks[i].trace[j]
+
+            self.tracks[i].trace.append(self.tracks[i].prediction)
+            self.tracks[i].KF.lastResult = self.tracks[i].prediction
+
+
+def scene(count, frames, seed=0):
+    """Detections of `count` vehicles moving across a frame, a few missed each frame."""
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(0, 40 * count, (count, 2))
+    velocities = rng.normal(0, 3, (count, 2))
+    for _ in range(frames):
+        positions += velocities
+        seen = rng.random(count) > 0.05
+        yield positions[seen] + rng.normal(0, 0.5, (seen.sum(), 2))
+
+
+def run(tracker, frames):
+    """Milliseconds per frame of tracker.update over the frames of a scene.
+
+    The first frame only creates the tracks, so it is left out of the timing.
+    """
+    tracker.update(frames[0])
+    start = time.perf_counter()
+    for frame in frames[1:]:
+        tracker.update(frame)
+    return (time.perf_counter() - start) / (len(frames) - 1) * 1000
+
+
+def main():
+    # python benchmark_tracker.py [frames]
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    options = dict(dist_thresh=30, max_frames_to_skip=5, max_trace_length=20, trackIdCount=0)
+    print(f"{'tracks':>8} {'legacy ms/frame':>17} {'batched ms/frame':>18} {'speedup':>9}")
+    for count in TRACK_COUNTS:
+        detections = list(scene(count, frames + 1))
+        # The original tracker takes each centroid as a (2, 1) column
+        legacy_ms = run(LegacyTracker(**options), [[d.reshape(2, 1) for d in frame] for frame in detections])
+        batched_ms = run(Tracker(**options), detections)
+        print(f"{count:>8} {legacy_ms:>17.2f} {batched_ms:>18.2f} {legacy_ms / batched_ms:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
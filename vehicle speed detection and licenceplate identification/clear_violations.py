@@ -1,9 +1,11 @@
 from models import mongo
+from utils.rollups import get_rollups
 
 def clear_violations():
     try:
         # Use the existing MongoDB connection from Flask app
         result = mongo.db.violations.delete_many({})
+        get_rollups().delete_many({})
         print(f'Successfully deleted {result.deleted_count} violations')
         return True
     except Exception as e:
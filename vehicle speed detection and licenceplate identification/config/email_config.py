@@ -6,6 +6,10 @@ SMTP_USERNAME = 'sidlamichhane99@gmail.com'  # Replace with your email
 SMTP_PASSWORD = 'gnhm mdes zbhz cdrk'      # Replace with your app password
 SENDER_EMAIL = 'sidlamichhane99@gmail.com'    # Replace with your email
 
+# Seconds over which violations of the same owner are grouped into one
+# digest email (0 sends a notification for every violation right away)
+DIGEST_WINDOW = 0
+
 # Email Template Settings
 EMAIL_SUBJECT = 'Speed Violation Notification'
 EMAIL_TEMPLATE = """
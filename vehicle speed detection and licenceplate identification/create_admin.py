@@ -1,10 +1,9 @@
 from werkzeug.security import generate_password_hash
-from pymongo import MongoClient
 from datetime import datetime
+from utils.mongo_pool import get_database
 
 # Connect to MongoDB
-client = MongoClient('mongodb://localhost:27017/')
-db = client['monitoring']
+db = get_database('monitoring')
 
 # Admin credentials with a stronger password hash method
 admin_user = {
@@ -0,0 +1,180 @@
+import queue
+import threading
+import time
+
+# Marker pushed through the queues once the source is exhausted
+_END = object()
+
+
+def batched(items, size):
+    """Group an iterable into lists of up to `size` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class FramePipeline:
+    """Run a frame source and a chain of stages on their own threads.
+
+    Consecutive stages are joined by bounded queues, so a slow stage applies
+    backpressure to everything in front of it instead of letting decoded
+    frames pile up in memory. Every stage runs on a single thread, which keeps
+    items in source order from one end of the pipeline to the other.
+
+    A stage is a callable taking one item and returning the item to pass on
+    (or None to pass nothing). It can also be given as a (stage, flush) pair;
+    flush is called once the source is exhausted and its result, if any, is
+    passed on as a last item.
+
+    on_drop(item) is called for every item that is not processed because
+    the pipeline stopped or its stage raised, so resources held by the item
+    (such as frame buffers) can be given back. on_stop() is called once
+    when the pipeline is stopped, e.g. to stop the reader feeding the source.
+    After a stop, run() waits at most stop_timeout seconds for the threads.
+    """
+
+    def __init__(self, source, stages, queue_size=8, on_drop=None, on_stop=None, stop_timeout=30.0):
+        self.source = source
+        self.stages = list(stages)
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in self.stages]
+        self.on_drop = on_drop
+        self.on_stop = on_stop
+        self.stop_timeout = stop_timeout
+        self.stop_event = threading.Event()
+        self.error = None
+        self._stopped_at = None
+        self._stop_lock = threading.Lock()
+        self._threads = []
+
+    def stop(self):
+        """Ask every stage to finish as soon as possible."""
+        with self._stop_lock:
+            if self.stop_event.is_set():
+                return
+            self._stopped_at = time.monotonic()
+            self.stop_event.set()
+        if self.on_stop is not None:
+            try:
+                self.on_stop()
+            except Exception as e:
+                print(f"Error stopping pipeline source: {str(e)}")
+
+    @property
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def backlog(self):
+        """Fraction of the queue capacity currently filled (0.0 - 1.0)."""
+        capacity = sum(q.maxsize for q in self.queues)
+        if capacity == 0:
+            return 0.0
+        return sum(q.qsize() for q in self.queues) / capacity
+
+    def _put(self, q, item):
+        # Block while the next stage is busy, but keep checking for a stop
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drop(self, item):
+        if self.on_drop is not None:
+            try:
+                self.on_drop(item)
+            except Exception as e:
+                print(f"Error releasing dropped pipeline item: {str(e)}")
+
+    def _fail(self, name, error):
+        if self.error is None:
+            self.error = error
+            print(f"\nError in pipeline stage '{name}': {str(error)}")
+        self.stop()
+
+    def _run_source(self):
+        out_q = self.queues[0]
+        try:
+            for item in self.source:
+                if not self._put(out_q, item):
+                    self._drop(item)
+                    break
+        except Exception as e:
+            self._fail('source', e)
+        finally:
+            self._put_end(out_q)
+
+    def _run_stage(self, index):
+        stage, flush = self.stages[index] if isinstance(self.stages[index], tuple) else (self.stages[index], None)
+        in_q = self.queues[index]
+        out_q = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        name = getattr(stage, '__name__', str(index))
+
+        while True:
+            item = in_q.get()
+            if item is _END:
+                break
+            if self.stop_event.is_set():
+                # Drain the queue so upstream stages never block on a stop
+                self._drop(item)
+                continue
+            try:
+                result = stage(item)
+            except Exception as e:
+                self._fail(name, e)
+                self._drop(item)
+                continue
+            if out_q is not None and result is not None and not self._put(out_q, result):
+                self._drop(result)
+
+        if flush is not None and not self.stop_event.is_set():
+            try:
+                result = flush()
+            except Exception as e:
+                self._fail(name, e)
+                result = None
+            if out_q is not None and result is not None and not self._put(out_q, result):
+                self._drop(result)
+
+        if out_q is not None:
+            self._put_end(out_q)
+
+    def _put_end(self, q):
+        # The end marker must always get through, even after a stop. The
+        # next stage keeps draining its queue, so this never blocks forever.
+        q.put(_END)
+
+    def run(self):
+        """Start all stages and block until the source is fully processed.
+
+        Re-raises the first exception raised by any stage. Once stopped, the
+        threads get stop_timeout seconds to finish; a stage still stuck
+        after that is abandoned (the threads are daemons) and RuntimeError
+        is raised.
+        """
+        self._threads = [threading.Thread(target=self._run_source, daemon=True)]
+        for index in range(len(self.stages)):
+            self._threads.append(
+                threading.Thread(target=self._run_stage, args=(index,), daemon=True)
+            )
+
+        for thread in self._threads:
+            thread.start()
+        for thread in self._threads:
+            while thread.is_alive():
+                thread.join(timeout=0.5)
+                stopped_at = self._stopped_at
+                if stopped_at is not None and time.monotonic() - stopped_at > self.stop_timeout:
+                    break
+
+        if self.error is not None:
+            raise self.error
+        alive = [thread for thread in self._threads if thread.is_alive()]
+        if alive:
+            raise RuntimeError(f"{len(alive)} pipeline thread(s) did not stop within {self.stop_timeout}s")
@@ -0,0 +1,68 @@
+import cv2
+
+
+class AdaptiveFrameScheduler:
+    """Decide which frames of a video go through detection.
+
+    Replaces a fixed "every 5th frame" sampling with a stride that follows
+    the scene:
+
+    - dense traffic (many active tracks) is detected at full frame rate,
+    - moving traffic is sampled at the base stride,
+    - an empty, still road backs off up to max_stride, and such frames are
+      only used for the cheap motion check instead of running the models,
+    - when the processing falls behind (lag close to 1.0) the stride grows
+      so the pipeline can catch up.
+    """
+
+    def __init__(self, base_stride=5, min_stride=1, max_stride=15,
+                 motion_threshold=2.0, busy_tracks=8, lag_threshold=0.5,
+                 max_idle_frames=30):
+        self.base_stride = base_stride
+        self.min_stride = min_stride
+        self.max_stride = max_stride
+        self.motion_threshold = motion_threshold  # Mean grey-level change that counts as motion
+        self.busy_tracks = busy_tracks  # Active tracks from which every frame is detected
+        self.lag_threshold = lag_threshold  # Backlog fraction from which strides grow
+        self.max_idle_frames = max_idle_frames  # Force a detection at least this often
+        self.stride = base_stride
+        self.frames_since_detection = 0
+        self._previous = None
+
+    def motion_score(self, frame):
+        """Mean absolute difference to the previously checked frame on a tiny thumbnail."""
+        small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        previous, self._previous = self._previous, small
+        if previous is None:
+            return float('inf')
+        return float(cv2.absdiff(small, previous).mean())
+
+    def schedule(self, frame, active_tracks=0, lag=0.0):
+        """Look at a candidate frame and plan the next one.
+
+        Returns (detect, stride): whether this frame should go through
+        detection, and how many frames to move forward before the next
+        candidate.
+        """
+        motion = self.motion_score(frame)
+        self.frames_since_detection += self.stride
+
+        if active_tracks >= self.busy_tracks:
+            stride = self.min_stride
+        elif active_tracks > 0 or motion >= self.motion_threshold:
+            stride = self.base_stride
+        else:
+            # Nothing on the road: back off gradually
+            stride = min(self.max_stride, self.stride * 2)
+
+        if lag > self.lag_threshold:
+            stride = min(self.max_stride, int(round(stride * (1 + lag))))
+        self.stride = max(self.min_stride, stride)
+
+        detect = (active_tracks > 0 or motion >= self.motion_threshold
+                  or self.frames_since_detection >= self.max_idle_frames)
+        if detect:
+            self.frames_since_detection = 0
+        return detect, self.stride
@@ -0,0 +1,197 @@
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+
+class FrameSource:
+    """Sequential reader for a video file that only decodes the frames it returns.
+
+    Frames that are skipped are only grabbed (demuxed), never decoded or
+    converted to BGR. When a skip is at least seek_threshold frames long,
+    the source seeks instead, which lets the decoder jump to the nearest
+    keyframe rather than walking through every frame.
+
+    Frames are numbered from 1, like the frame counters of the processing
+    loops that use this class.
+    """
+
+    def __init__(self, path, seek_threshold=None):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Error opening video file: {path}")
+
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps > 0 else 30.0  # Default to 30 fps if unable to determine
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.seek_threshold = seek_threshold
+        self.position = 0  # Number of the last frame grabbed
+        self.finished = False
+
+    def timestamp(self, frame_number):
+        """Position of a frame in the video, in seconds."""
+        return (frame_number - 1) / self.fps
+
+    def seek(self, frame_number):
+        """Position the source so the next read returns `frame_number`."""
+        if self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number - 1):
+            self.position = frame_number - 1
+        else:
+            self.skip(frame_number - 1 - self.position)
+
+    def skip(self, count):
+        """Move past `count` frames without decoding them."""
+        if count <= 0 or self.finished:
+            return not self.finished
+
+        if self.seek_threshold and count >= self.seek_threshold:
+            target = self.position + count
+            if self.total_frames and target >= self.total_frames:
+                self.finished = True
+                return False
+            if self.cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+                self.position = target
+                return True
+
+        for _ in range(count):
+            if not self.cap.grab():
+                self.finished = True
+                return False
+            self.position += 1
+        return True
+
+    def read_next(self, stride=1, image=None):
+        """Skip stride - 1 frames and decode the next one.
+
+        Returns (frame_number, timestamp, frame), or None at the end of the
+        video. `image` may be a preallocated array for the decoder to reuse.
+        """
+        if not self.skip(stride - 1):
+            return None
+        if not self.cap.grab():
+            self.finished = True
+            return None
+        self.position += 1
+
+        ret, frame = self.cap.retrieve(image)
+        if not ret:
+            self.finished = True
+            return None
+        return self.position, self.timestamp(self.position), frame
+
+    def __iter__(self):
+        while True:
+            item = self.read_next()
+            if item is None:
+                return
+            yield item
+
+    def release(self):
+        self.cap.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class PrefetchingFrameReader:
+    """Decode frames of a FrameSource on a background thread.
+
+    Frames are decoded into a ring of preallocated arrays, so decoding
+    overlaps with whatever the consumer does and no new frame buffer is
+    allocated per read: memory stays flat however long the video is. When
+    every buffer is in use the reader thread waits, which bounds how far it
+    can run ahead.
+
+    Iterating yields (frame_number, timestamp, frame). With auto_release
+    the buffer of a frame goes back to the ring as soon as the next frame is
+    requested; otherwise the consumer hands it back with release(), which
+    lets frames travel through other threads first.
+
+    `stride` is either a number or a callable returning the stride of the
+    next read, so a scheduler can keep steering a reader that runs ahead.
+    """
+
+    def __init__(self, source, buffer_size=16, stride=1, auto_release=True):
+        self.source = source
+        self.stride = stride
+        self.auto_release = auto_release
+        shape = (max(source.height, 1), max(source.width, 1), 3)
+        self.buffers = [np.empty(shape, dtype=np.uint8) for _ in range(buffer_size)]
+        self._free = queue.Queue()
+        for slot in range(buffer_size):
+            self._free.put(slot)
+        self._ready = queue.Queue()
+        self._slots = {}  # frame number -> buffer slot held by the consumer
+        self._slots_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    slot = self._free.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                stride = self.stride() if callable(self.stride) else self.stride
+                item = self.source.read_next(stride, image=self.buffers[slot])
+                if item is None:
+                    break
+
+                frame_number, timestamp, frame = item
+                # The decoder reallocates if the frame does not fit the buffer
+                self.buffers[slot] = frame
+                self._ready.put((slot, frame_number, timestamp, frame))
+        except Exception as e:
+            print(f"Error reading frames: {str(e)}")
+        finally:
+            self._ready.put(None)
+
+    def __iter__(self):
+        self.start()
+        previous = None
+        while True:
+            if self.auto_release and previous is not None:
+                self.release(previous)
+
+            if self._stop.is_set():
+                return
+            try:
+                entry = self._ready.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if entry is None:
+                return
+
+            slot, frame_number, timestamp, frame = entry
+            with self._slots_lock:
+                self._slots[frame_number] = slot
+            previous = frame_number
+            yield frame_number, timestamp, frame
+
+    def release(self, frame_number):
+        """Give the buffer of a frame back to the ring."""
+        with self._slots_lock:
+            slot = self._slots.pop(frame_number, None)
+        if slot is not None:
+            self._free.put(slot)
+
+    def stop(self):
+        """Stop the reader thread (the source itself stays open)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
@@ -1,68 +1,173 @@
 import numpy as np
 
+DEFAULT_DT = 1 / 30.  # seconds between frames when no timestamps are given
+MEASUREMENT_NOISE = 4.0  # variance of a detected centroid, pixels^2
+PROCESS_NOISE = 2500.0  # variance of the unmodelled acceleration, (pixels/s^2)^2
+VELOCITY_VARIANCE = 250000.0  # initial velocity variance, (pixels/s)^2
+
+# Observation matrix: the detector measures the position (x, y)
+H = np.array([[1.0, 0.0, 0.0, 0.0],
+              [0.0, 1.0, 0.0, 0.0]])
+
+
+def motion_model(dt, process_noise=PROCESS_NOISE):
+    """Transition and process noise matrices of the constant-velocity model.
+
+    dt may be a scalar or an array of intervals; the matrices then have
+    shape dt.shape + (4, 4). The process noise is that of a random
+    acceleration with variance process_noise held over each interval.
+    """
+    dt = np.asarray(dt, dtype=float)[..., None, None]
+    zero = np.zeros_like(dt)
+    one = np.ones_like(dt)
+    F = np.block([[one, zero, dt, zero],
+                  [zero, one, zero, dt],
+                  [zero, zero, one, zero],
+                  [zero, zero, zero, one]])
+    pp, pv, vv = dt ** 4 / 4, dt ** 3 / 2, dt ** 2
+    Q = process_noise * np.block([[pp, zero, pv, zero],
+                                  [zero, pp, zero, pv],
+                                  [pv, zero, vv, zero],
+                                  [zero, pv, zero, vv]])
+    return F, Q
+
+
+def inv2(M):
+    """Inverse of a stack of 2x2 matrices (..., 2, 2), in closed form."""
+    a, b = M[..., 0, 0], M[..., 0, 1]
+    c, d = M[..., 1, 0], M[..., 1, 1]
+    inv = np.stack((np.stack((d, -b), axis=-1), np.stack((-c, a), axis=-1)), axis=-2)
+    return inv / (a * d - b * c)[..., None, None]
+
 
 class KalmanFilter(object):
-    
+    """Constant-velocity Kalman filter of an object's image position.
 
-    def __init__(self):
-        
-        self.dt = 0.005  # delta time
+    The state is (x, y, vx, vy): the centroid in pixels and its velocity
+    in pixels per second. predict(dt) moves the state dt seconds forward,
+    so frames may come at any interval (e.g. from their real timestamps),
+    and the velocity is read straight from the state.
+    """
 
-        self.A = np.array([[1, 0], [0, 1]])  # matrix in observation equations
-        self.u = np.zeros((2, 1))  # previous state vector
+    def __init__(self, position=(0, 0), dt=DEFAULT_DT, process_noise=PROCESS_NOISE,
+                 measurement_noise=MEASUREMENT_NOISE, velocity_variance=VELOCITY_VARIANCE):
 
-        # (x,y) tracking object center
-        self.b = np.array([[0], [255]])  # vector of observations
+        self.dt = dt  # default delta time, seconds
+        self.process_noise = process_noise
 
-        self.P = np.diag((3.0, 3.0))  # covariance matrix
-        self.F = np.array([[1.0, self.dt], [0.0, 1.0]])  # state transition mat
+        self.x = np.zeros((4, 1))  # state vector (x, y, vx, vy)
+        self.x[:2, 0] = np.ravel(position)
+        # covariance matrix: the position is as certain as one detection,
+        # the velocity unknown
+        self.P = np.diag((measurement_noise, measurement_noise,
+                          velocity_variance, velocity_variance))
+        self.H = H  # matrix in observation equations
+        self.R = measurement_noise * np.eye(2)  # observation noise matrix
+        self.lastResult = self.x[:2].copy()
 
-        self.Q = np.eye(self.u.shape[0])  # process noise matrix
-        self.R = np.eye(self.b.shape[0])  # observation noise matrix
-        self.lastResult = np.array([[0], [255]])
+    @property
+    def velocity(self):
+        """Estimated velocity (vx, vy) in pixels per second."""
+        return self.x[2:, 0].copy()
 
-    def predict(self):
-        
-        # Predicted state estimate
-        self.u = np.round(np.dot(self.F, self.u))
-        # Predicted estimate covariance
-        self.P = np.dot(self.F, np.dot(self.P, self.F.T)) + self.Q
-        self.lastResult = self.u  # same last predicted result
-        return self.u
+    def predict(self, dt=None):
+        """Move the state dt seconds forward; returns the predicted position (2, 1)."""
+        F, Q = motion_model(self.dt if dt is None else dt, self.process_noise)
+        self.x = np.dot(F, self.x)
+        self.P = np.dot(F, np.dot(self.P, F.T)) + Q
+        self.lastResult = self.x[:2].copy()
+        return self.lastResult
 
     def correct(self, b, flag):
-        """Correct or update state vector u and variance of uncertainty P (covariance).
-        where,
-        u: predicted state vector u
-        A: matrix in observation equations
-        b: vector of observations
-        P: predicted covariance matrix
-        Q: process noise matrix
-        R: observation noise matrix
-        Equations:
-            C = AP_{k|k-1} A.T + R
-            K_{k} = P_{k|k-1} A.T(C.Inv)
-            u'_{k|k} = u'_{k|k-1} + K_{k}(b_{k} - Au'_{k|k-1})
-            P_{k|k} = P_{k|k-1} - K_{k}(CK.T)
-            where,
-                A.T is A transpose
-                C.Inv is C inverse
+        """Correct the state with the observed position b.
+
         Args:
-            b: vector of observations
-            flag: if "true" prediction result will be updated else detection
+            b: observed position (x, y)
+            flag: if false there is no observation and the prediction stands
         Return:
-            predicted state vector u
+            estimated position (2, 1)
         """
+        if not flag:
+            return self.lastResult
+
+        b = np.asarray(b, dtype=float).reshape(2, 1)
+        S = np.dot(self.H, np.dot(self.P, self.H.T)) + self.R
+        K = np.dot(self.P, np.dot(self.H.T, np.linalg.inv(S)))
+
+        self.x = self.x + np.dot(K, b - np.dot(self.H, self.x))
+        # Joseph form keeps P symmetric positive definite
+        I_KH = np.eye(4) - np.dot(K, self.H)
+        self.P = np.dot(I_KH, np.dot(self.P, I_KH.T)) + np.dot(K, np.dot(self.R, K.T))
+        self.lastResult = self.x[:2].copy()
+        return self.lastResult
+
+
+class KalmanFilterBank(object):
+    """The KalmanFilter of many objects, stored as stacked arrays.
+
+    Row i of x (N, 4) and P (N, 4, 4) is the filter of object i, with the
+    same model as KalmanFilter; predict and correct run for every row in
+    one batched operation.
+    """
+
+    def __init__(self, dt=DEFAULT_DT, process_noise=PROCESS_NOISE,
+                 measurement_noise=MEASUREMENT_NOISE, velocity_variance=VELOCITY_VARIANCE):
+
+        self.dt = dt  # default delta time, seconds
+        self.process_noise = process_noise
+        self.H = H  # matrix in observation equations
+        self.R = measurement_noise * np.eye(2)  # observation noise matrix
+        self.P0 = np.diag((measurement_noise, measurement_noise,
+                           velocity_variance, velocity_variance))  # initial covariance
+
+        self.x = np.zeros((0, 4))
+        self.P = np.zeros((0, 4, 4))
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def lastResult(self):
+        """Current position estimates (N, 2)."""
+        return self.x[:, :2]
+
+    @property
+    def velocity(self):
+        """Estimated velocities (N, 2) in pixels per second."""
+        return self.x[:, 2:]
+
+    def add(self, positions):
+        """Start a filter at each (x, y) position, with an unknown velocity."""
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        x = np.zeros((len(positions), 4))
+        x[:, :2] = positions
+        self.x = np.concatenate((self.x, x))
+        self.P = np.concatenate((self.P, np.broadcast_to(self.P0, (len(positions), 4, 4))))
+
+    def keep(self, mask):
+        """Drop the filters where mask is False."""
+        self.x = self.x[mask]
+        self.P = self.P[mask]
+
+    def predict(self, dt=None):
+        """Move every state dt seconds forward (a scalar, or one interval per
+        row); returns the predicted positions (N, 2)."""
+        F, Q = motion_model(self.dt if dt is None else dt, self.process_noise)
+        self.x = (F @ self.x[:, :, None])[:, :, 0]
+        self.P = F @ self.P @ np.swapaxes(F, -1, -2) + Q
+        return self.lastResult
 
-        if not flag:  # update using prediction
-            self.b = self.lastResult
-        else:  # update using detection
-            self.b = b
-        C = np.dot(self.A, np.dot(self.P, self.A.T)) + self.R
-        K = np.dot(self.P, np.dot(self.A.T, np.linalg.inv(C)))
-
-        self.u = np.round(self.u + np.dot(K, (self.b - np.dot(self.A,
-                                                              self.u))))
-        self.P = self.P - np.dot(K, np.dot(C, K.T))
-        self.lastResult = self.u
-        return self.u
\ No newline at end of file
+    def correct(self, b, flags):
+        """Correct the filters where flags is set with their row of b (N, 2);
+        the others keep their prediction. Returns the positions (N, 2)."""
+        rows = np.flatnonzero(flags)
+        if len(rows):
+            x = self.x[rows]
+            P = self.P[rows]
+            PHT = P @ self.H.T
+            K = PHT @ inv2(self.H @ PHT + self.R)
+            y = np.asarray(b, dtype=float)[rows] - x[:, :2]
+            self.x[rows] = x + (K @ y[:, :, None])[:, :, 0]
+            I_KH = np.eye(4) - K @ self.H
+            self.P[rows] = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ self.R @ K.transpose(0, 2, 1)
+        return self.lastResult
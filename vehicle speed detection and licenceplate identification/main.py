@@ -4,6 +4,9 @@ import pytesseract
 import os
 from datetime import datetime
 import math
+from frame_scheduler import AdaptiveFrameScheduler
+from frame_source import FrameSource
+from utils.job_scheduler import DONE
 
 class VehicleSpeedDetector:
     def __init__(self):
@@ -13,6 +16,7 @@ class VehicleSpeedDetector:
         # Parameters for speed calculation
         self.frame_count = 0
         self.previous_centroid = None
+        self.previous_centroid_frame = None
         self.previous_plate = None
         self.real_world_width = 2.5  # meters (average car width)
         self.fps = None
@@ -58,8 +62,9 @@ class VehicleSpeedDetector:
         return None, None, None
 
     def calculate_speed(self, current_centroid, frame_difference):
-        if self.previous_centroid is None:
+        if self.previous_centroid is None or frame_difference <= 0:
             self.previous_centroid = current_centroid
+            self.previous_centroid_frame = self.frame_count
             return 0
         
         pixel_distance = math.sqrt(
@@ -77,12 +82,13 @@ class VehicleSpeedDetector:
         speed = min(max(speed, 0), 120)  # Limit speed between 0 and 120 km/h
         
         self.previous_centroid = current_centroid
+        self.previous_centroid_frame = self.frame_count
         return speed
 
     def process_video(self, video_path, status_dict=None):
-        cap = cv2.VideoCapture(video_path)
-        self.fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        source = FrameSource(video_path, seek_threshold=30)
+        self.fps = source.fps
+        total_frames = source.total_frames
         
         # Create output directories
         os.makedirs("static/uploads/detections", exist_ok=True)
@@ -93,30 +99,39 @@ class VehicleSpeedDetector:
             output_path,
             fourcc,
             self.fps,
-            (int(cap.get(3)), int(cap.get(4)))
+            (source.width, source.height)
         )
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
+        scheduler = AdaptiveFrameScheduler()
+        stride = scheduler.stride
+        plate_in_view = False
+        
+        while True:
+            # Skipped frames are only grabbed, not decoded
+            item = source.read_next(stride)
+            if item is None:
                 break
                 
-            self.frame_count += 1
+            self.frame_count, _, frame = item
             
             # Update processing status
             if status_dict is not None:
                 progress = int((self.frame_count / total_frames) * 100)
                 status_dict['progress'] = progress
             
-            # Process every 5th frame for performance
-            if self.frame_count % 5 != 0:
+            # Sample frames adaptively: faster while a plate is in view,
+            # cheaply skipping stretches of empty road
+            detect, stride = scheduler.schedule(frame, active_tracks=int(plate_in_view))
+            if not detect:
                 continue
                 
             # Detect license plate
             plate_img, plate_text, centroid = self.detect_plate(frame)
+            plate_in_view = bool(plate_text and centroid)
             
             if plate_text and centroid:
-                speed = self.calculate_speed(centroid, 5)
+                frame_difference = self.frame_count - (self.previous_centroid_frame or self.frame_count)
+                speed = self.calculate_speed(centroid, frame_difference)
                 
                 # Draw results on frame
                 cv2.putText(frame, f"Plate: {plate_text}", (10, 30),
@@ -133,11 +148,11 @@ class VehicleSpeedDetector:
             
             out.write(frame)
         
-        cap.release()
+        source.release()
         out.release()
         
         if status_dict is not None:
-            status_dict['status'] = 'completed'
+            status_dict['status'] = DONE
             status_dict['progress'] = 100
         
         return output_path
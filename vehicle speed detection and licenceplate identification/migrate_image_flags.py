@@ -0,0 +1,32 @@
+import os
+
+from pymongo import UpdateOne
+
+from utils.mongo_pool import get_database
+
+
+def migrate_image_flags(batch_size=500):
+    """Store image_exists on violations saved before the flag existed."""
+    violations = get_database('monitoring')['violations']
+    cursor = violations.find({'image_exists': {'$exists': False}}, {'image_path': 1}).batch_size(batch_size)
+
+    updates = []
+    total = 0
+    for violation in cursor:
+        image_path = violation.get('image_path') or ''
+        full_image_path = os.path.join('static', 'violations', os.path.basename(image_path))
+        exists = bool(image_path) and os.path.exists(full_image_path)
+        updates.append(UpdateOne({'_id': violation['_id']}, {'$set': {'image_exists': exists}}))
+        if len(updates) >= batch_size:
+            total += violations.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        total += violations.bulk_write(updates, ordered=False).modified_count
+    return total
+
+
+if __name__ == '__main__':
+    try:
+        print(f'Stored image_exists on {migrate_image_flags()} violations')
+    except Exception as e:
+        print(f'Error migrating image flags: {str(e)}')
@@ -0,0 +1,269 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Models served by default: name -> YOLO weights
+DEFAULT_MODELS = {
+    'vehicle': 'yolov8n.pt',
+    'plate': 'yolov8.pt'
+}
+DEFAULT_SLOTS = int(os.environ.get('MODEL_SERVER_SLOTS', 4))
+DEFAULT_SLOT_MB = int(os.environ.get('MODEL_SERVER_SLOT_MB', 32))
+HEALTH_CHECK_INTERVAL = 1.0  # Seconds between checks that the server process is alive
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def _serve(models, slot_names, requests, responses):
+    """Main loop of the server process: load the models once, then answer requests."""
+    from ultralytics import YOLO
+
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    try:
+        loaded = {name: YOLO(weights) for name, weights in models.items()}
+        responses.put(('ready', None, None))
+        print(f"Model server loaded {', '.join(loaded)} (pid {os.getpid()})")
+
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+
+            request_id, model_name, slot, layout = request
+            try:
+                # The images are views into the shared slot: nothing is copied
+                images = [np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf, offset=offset)
+                          for offset, shape in layout]
+                results = loaded[model_name](images, verbose=False)
+                boxes = [[tuple(map(int, box[:4].tolist())) for box in result.boxes.xyxy]
+                         for result in results]
+                del images
+                responses.put((request_id, boxes, None))
+            except Exception as e:
+                responses.put((request_id, None, str(e)))
+    except Exception as e:
+        responses.put(('ready', None, str(e)))
+    finally:
+        for slot in slots:
+            slot.close()
+
+
+class ModelServer:
+    """YOLO models loaded once in a separate process and shared by every upload job.
+
+    Clients copy their frames or crops into one of a few fixed shared-memory
+    slots and only send the slot layout over the request queue; the server
+    runs the model on views of that memory and sends back the boxes. The
+    slots bound both the memory used for transfers and the number of
+    requests in flight, and there is a single copy of the weights however
+    many videos are processed at once.
+
+    A slot goes back to the free pool only when the server has replied to
+    the request using it: a request that times out keeps its slot until
+    the late reply arrives, so the next request cannot overwrite frames the
+    server is still reading. If the server process dies, every pending and
+    later request fails at once instead of waiting for the timeout.
+    """
+
+    def __init__(self, models=None, slots=DEFAULT_SLOTS, slot_mb=DEFAULT_SLOT_MB, timeout=300):
+        self.models = dict(models or DEFAULT_MODELS)
+        self.slot_count = max(1, int(slots))
+        self.slot_bytes = int(slot_mb) * 1024 * 1024
+        self.timeout = timeout  # Seconds to wait for the models to load or for a reply
+        self.process = None
+        self._slots = []
+        self._free = queue.Queue()
+        self._pending = {}  # request id -> (Future, slot)
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._ready = threading.Event()
+        self._error = None
+        self._dead = None  # Why the server process is gone, once it is
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the server process (only the first call does any work)."""
+        with self._start_lock:
+            if self.process is not None:
+                return self
+
+            for slot in range(self.slot_count):
+                self._slots.append(shared_memory.SharedMemory(create=True, size=self.slot_bytes))
+                self._free.put(slot)
+
+            context = multiprocessing.get_context('spawn')
+            self._requests = context.Queue()
+            self._responses = context.Queue()
+            self.process = context.Process(
+                target=_serve,
+                args=(self.models, [slot.name for slot in self._slots], self._requests, self._responses),
+                daemon=True
+            )
+            self.process.start()
+            threading.Thread(target=self._dispatch, args=(self.process, self._responses, self._free),
+                             daemon=True).start()
+            return self
+
+    def _dispatch(self, process, responses, free):
+        # Route every response to the Future of the request it answers, and
+        # fail everything pending as soon as the server process is gone
+        while self.process is process:
+            try:
+                request_id, boxes, error = responses.get(timeout=HEALTH_CHECK_INTERVAL)
+            except queue.Empty:
+                if not process.is_alive():
+                    self._fail(f"Model server process exited with code {process.exitcode}")
+                    break
+                continue
+            except (EOFError, OSError, ValueError):
+                break
+
+            if request_id == 'ready':
+                self._error = error
+                self._ready.set()
+                continue
+
+            with self._pending_lock:
+                future, slot = self._pending.pop(request_id, (None, None))
+            if future is None:
+                continue
+            # The server has finished with the slot, even if the client gave up
+            free.put(slot)
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(f"Model server error: {error}"))
+            else:
+                future.set_result(boxes)
+
+    def _fail(self, reason):
+        # Fail the pending requests and every later one
+        with self._pending_lock:
+            self._dead = reason
+            pending, self._pending = self._pending, {}
+        if not self._ready.is_set():
+            self._error = reason
+            self._ready.set()
+        for future, _ in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+
+    def wait_ready(self):
+        self.start()
+        if not self._ready.wait(self.timeout):
+            raise RuntimeError("Model server did not load its models in time")
+        if self._error is not None:
+            raise RuntimeError(f"Model server failed to start: {self._error}")
+        if self._dead is not None:
+            raise RuntimeError(self._dead)
+
+    def _acquire_slot(self):
+        # A free slot, checking on the server while all of them are in use
+        waited = 0
+        while True:
+            if self._dead is not None:
+                raise RuntimeError(self._dead)
+            try:
+                return self._free.get(timeout=HEALTH_CHECK_INTERVAL)
+            except queue.Empty:
+                waited += HEALTH_CHECK_INTERVAL
+                if waited >= self.timeout:
+                    raise RuntimeError("No model server slot was freed in time")
+
+    def predict_boxes(self, model_name, images):
+        """Run a served model on a list of images.
+
+        Returns one list of integer (x1, y1, x2, y2) boxes per input image,
+        like VideoProcessor.predict_boxes. Empty crops are skipped, and
+        images that do not fit in one slot are sent in several requests.
+        """
+        boxes = [[] for _ in images]
+        valid = [i for i, image in enumerate(images) if image is not None and image.size > 0]
+        if not valid:
+            return boxes
+
+        self.wait_ready()
+        chunk = []
+        used = 0
+        for i in valid:
+            size = images[i].nbytes
+            if size > self.slot_bytes:
+                raise ValueError(f"Image of {size} bytes does not fit in a {self.slot_bytes} byte slot")
+            if chunk and used + size > self.slot_bytes:
+                self._predict_chunk(model_name, images, chunk, boxes)
+                chunk, used = [], 0
+            chunk.append(i)
+            used += size
+        self._predict_chunk(model_name, images, chunk, boxes)
+        return boxes
+
+    def _predict_chunk(self, model_name, images, indices, boxes):
+        slot = self._acquire_slot()
+        sent = False
+        try:
+            layout = []
+            offset = 0
+            for i in indices:
+                image = images[i]
+                view = np.ndarray(image.shape, dtype=np.uint8, buffer=self._slots[slot].buf, offset=offset)
+                np.copyto(view, image)
+                layout.append((offset, image.shape))
+                offset += image.nbytes
+            del view
+
+            future = Future()
+            request_id = next(self._ids)
+            with self._pending_lock:
+                if self._dead is not None:
+                    raise RuntimeError(self._dead)
+                # From here the slot is released by the dispatcher, on the reply
+                self._pending[request_id] = (future, slot)
+                sent = True
+            self._requests.put((request_id, model_name, slot, layout))
+        finally:
+            if not sent:
+                self._free.put(slot)
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise RuntimeError(f"Model server did not answer within {self.timeout}s; "
+                               f"slot {slot} stays reserved until it does")
+        for i, image_boxes in zip(indices, result):
+            boxes[i] = image_boxes
+
+    def stop(self):
+        """Stop the server process and free the shared memory."""
+        with self._start_lock:
+            if self.process is None:
+                return
+            self._requests.put(None)
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+            self._fail("Model server stopped")
+            for slot in self._slots:
+                slot.close()
+                slot.unlink()
+            self._slots = []
+            self._free = queue.Queue()
+            self._ready = threading.Event()
+            self._error = None
+            self._dead = None
+
+
+def get_model_server():
+    """Return the shared model server, starting it on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ModelServer().start()
+        return _server
@@ -27,8 +27,13 @@ import imutils
 import dlib
 import time
 import cv2
+import sys
 import os
 
+# the shared frame source lives in the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_source import FrameSource, PrefetchingFrameReader
+
 def upload_file(tempFile, client, imageID):
 	# upload the image to Dropbox and cleanup the tempory image
 	print("[INFO] uploading {}...".format(imageID))
@@ -66,11 +71,13 @@ net = cv2.dnn.readNetFromCaffe(conf["prototxt_path"],
 	conf["model_path"])
 #net.setPreferableTarget(cv2.dnn.DNN_TARGET_MYRIAD)
 
-# initialize the video stream and allow the camera sensor to warmup
-print("[INFO] warming up camera...")
+# open the video file and start decoding frames on a background thread
+# (a video file needs no camera warmup)
+print("[INFO] opening video file...")
 #vs = VideoStream(src=0).start()
-vs = cv2.VideoCapture(args["input"])
-time.sleep(2.0)
+vs = FrameSource(args["input"])
+reader = PrefetchingFrameReader(vs).start()
+frames = iter(reader)
 
 # initialize the frame dimensions (we'll set them as soon as we read
 # the first frame from the video)
@@ -102,13 +109,15 @@ fps = FPS().start()
 while True:
 	# grab the next frame from the stream, store the current
 	# timestamp, and store the new date
-	ret, frame  = vs.read()
+	item = next(frames, None)
 	ts = datetime.now()
 	newDate = ts.strftime("%m-%d-%y")
 
-	# check if the frame is None, if so, break out of the loop
-	if frame is None:
+	# check if we reached the end of the video, if so, break out of
+	# the loop
+	if item is None:
 		break
+	frame = item[2]
 
 	# if the log file has not been created or opened
 	if logFile is None:
@@ -445,7 +454,9 @@ print("[INFO] approx. FPS: {:.2f}".format(fps.fps()))
 if logFile is not None:
 	logFile.close()
 
-# close any open windows
+# stop the reader, release the video file and close any open windows
+reader.stop()
+vs.release()
 cv2.destroyAllWindows()
 
 # clean up
@@ -1,10 +1,8 @@
 import pandas as pd
 from datetime import datetime
+import os
 import re
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
+from utils.email_queue import get_email_queue
 from models.user_vehicle import UserVehicle
 from models.violation_log import ViolationLog
 
@@ -20,14 +18,7 @@ def clean_plate_number(plate):
     return cleaned.strip()
 
 def send_violation_email(user_data, speed, timestamp, image_path):
-    sender_email = "your_email@gmail.com"
-    sender_password = "your_app_password"
-    receiver_email = user_data['email']
-    
-    message = MIMEMultipart()
-    message["From"] = sender_email
-    message["To"] = receiver_email
-    message["Subject"] = f"Speed Violation Alert - {user_data['license_plate']}"
+    subject = f"Speed Violation Alert - {user_data['license_plate']}"
     
     body = f"""
     Dear {user_data['name']},
@@ -48,23 +39,9 @@ def send_violation_email(user_data, speed, timestamp, image_path):
     Traffic Monitoring System
     """
     
-    message.attach(MIMEText(body, "plain"))
-    
-    if image_path and os.path.exists(image_path):
-        with open(image_path, 'rb') as img_file:
-            img = MIMEImage(img_file.read())
-            img.add_header('Content-Disposition', 'attachment', filename=f"violation_{timestamp}.jpg")
-            message.attach(img)
-    
-    try:
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.send_message(message)
-        server.quit()
-        print(f"Violation email sent to {receiver_email}")
-    except Exception as e:
-        print(f"Failed to send email: {str(e)}")
+    attachments = [image_path] if image_path and os.path.exists(image_path) else []
+    # Queued: all the emails of a run share one SMTP session
+    get_email_queue().send(user_data['email'], subject, body, attachments)
 
 def process_log():
     df = pd.read_csv('detections/log.txt', names=['timestamp', 'plate', 'speed'])
@@ -127,4 +104,7 @@ def process_log():
         f.write("Plate,Owner,Email,Avg Speed,Max Speed,First Seen,Last Seen,Violations\n")
         for r in results:
             f.write(f"{r['plate']},{r['owner']},{r['email']},{r['avg_speed']},{r['max_speed']},"
-                   f"{r['first_seen']},{r['last_seen']},{r['violation_count']}\n")
\ No newline at end of file
+                   f"{r['first_seen']},{r['last_seen']},{r['violation_count']}\n")
+    
+    # Wait for the queued violation emails before exiting
+    get_email_queue().flush()
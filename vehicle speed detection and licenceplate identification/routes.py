@@ -5,18 +5,76 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from models import mongo
 from models.user import User
 from bson.objectid import ObjectId
-from datetime import datetime, timedelta
+from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
 from video_processor import VideoProcessor
+from video_sharding import ShardedVideoProcessor
+from model_server import get_model_server
 from vehicle_speed_detector import VehicleSpeedDetector  # Add this import
 from clear_violations import clear_violations
-
-# Global variable to track video processing status
-video_processing = False
+from utils.job_scheduler import JobScheduler, QUEUED, RUNNING, CANCELLED
+from utils.email_queue import get_email_queue
+from utils.rollups import apply_rollups, count_violations, traffic_counts
+from utils.pagination import keyset_page
+import queue
 
 from flask_login import current_user
-import threading
+
+
+def update_video_job(job_id, fields):
+    """Persist the state of a video processing job in its video document."""
+    mongo.db.videos.update_one({'_id': ObjectId(job_id)}, {'$set': fields})
+
+
+# Bounded queue of uploaded videos waiting for one of the processing workers
+job_scheduler = JobScheduler(
+    workers=app.config['VIDEO_JOB_WORKERS'],
+    max_queued=app.config['VIDEO_JOB_QUEUE_SIZE'],
+    on_update=update_video_job
+)
+
+
+def video_job(filepath):
+    """Build the job that processes one uploaded video."""
+    def run(status_dict):
+        # Long videos are split across worker processes when sharding is enabled
+        if app.config['VIDEO_SHARD_WORKERS'] > 1:
+            processor = ShardedVideoProcessor(workers=app.config['VIDEO_SHARD_WORKERS'])
+        else:
+            # Inference goes to the model server, so uploads share one copy of the models
+            processor = VideoProcessor(model_server=get_model_server())
+        return processor.process_video(filepath, status_dict)
+    return run
+
+
+def resume_video_jobs():
+    """Queue again the jobs a server restart interrupted."""
+    try:
+        videos = list(mongo.db.videos.find({'status': {'$in': [QUEUED, RUNNING]}}).sort('uploaded_at', 1))
+    except Exception as e:
+        print(f"Error resuming video jobs: {str(e)}")
+        return
+    job_scheduler.resume((str(video['_id']), video_job(video['filepath']), video.get('priority', 0))
+                         for video in videos)
+
+
+def video_job_status(video):
+    """Status of a video job, preferring the live state of unfinished jobs."""
+    job_id = str(video['_id'])
+    status = {
+        'job_id': job_id,
+        'filename': video.get('filename'),
+        'status': video.get('status', 'unknown'),
+        'progress': video.get('progress', 0),
+        'queue_position': None,
+        'error': video.get('error_message'),
+        'detections': video.get('detections', [])
+    }
+    live = job_scheduler.get(job_id)
+    if live:
+        status.update(live)
+    return status
 
 @app.route('/')
 def index():
@@ -51,8 +109,16 @@ def login():
 @app.route('/check_processing_status')
 @login_required
 def check_processing_status():
-    global video_processing
-    return jsonify({'is_processing': video_processing})
+    try:
+        active = mongo.db.videos.find({'status': {'$in': [QUEUED, RUNNING]}}).sort('uploaded_at', 1)
+        jobs = [video_job_status(video) for video in active]
+        return jsonify({
+            'is_processing': any(job['status'] == RUNNING for job in jobs),
+            'jobs': jobs
+        })
+    except Exception as e:
+        print(f"Status check error: {str(e)}")
+        return jsonify({'is_processing': False, 'jobs': [], 'error': str(e)})
 
 @app.route('/clear_violations', methods=['POST'])
 @login_required
@@ -69,7 +135,7 @@ def clear_all_violations():
 def dashboard():
     # Remove the authentication check since @login_required handles it
     try:
-        total_violations = mongo.db.violations.count_documents({})
+        total_violations = count_violations()
         total_users = mongo.db.users.count_documents({})
         return render_template('dashboard.html',
                              total_violations=total_violations,
@@ -203,37 +269,58 @@ def delete_user():
     except Exception as e:
         return jsonify({'error': str(e)})
 
+VIOLATIONS_PER_PAGE = 50
+VIOLATION_FIELDS = {'timestamp': 1, 'license_plate': 1, 'speed': 1, 'image_path': 1, 'image_exists': 1}
+
+
+def violation_image_exists(violation):
+    """Stored image_exists flag; older documents without it are checked on disk
+    (migrate_image_flags.py stores the flag for them)."""
+    if 'image_exists' not in violation:
+        image_path = violation.get('image_path') or ''
+        full_image_path = os.path.join(app.static_folder, 'violations', os.path.basename(image_path))
+        return bool(image_path) and os.path.exists(full_image_path)
+    return violation['image_exists']
+
+
 @app.route('/violations')
 @login_required
 def violations():
     try:
-        # Get all violations from the database without any limit
-        violations_list = list(mongo.db.violations.find().sort('timestamp', -1))
-        formatted_violations = []
+        # Keyset pagination on (timestamp, _id), newest first: `before` pages
+        # towards older violations, `after` back towards newer ones
+        per_page = min(request.args.get('per_page', VIOLATIONS_PER_PAGE, type=int), 200)
+        before = request.args.get('before')
+        after = request.args.get('after')
+        
+        query = {
+            'timestamp': {'$exists': True},
+            'license_plate': {'$exists': True},
+            'speed': {'$exists': True},
+            'image_path': {'$exists': True},
+            'image_exists': {'$ne': False}
+        }
+        # Rows whose image is gone are skipped, as before
+        rows, pagination = keyset_page(mongo.db.violations, query, VIOLATION_FIELDS, per_page,
+                                       before, after, keep=violation_image_exists)
         
-        for violation in violations_list:
-            # Only process violations that have all required fields
-            if all(key in violation for key in ['_id', 'timestamp', 'license_plate', 'speed', 'image_path']):
-                # Ensure image path is properly formatted for static file serving
-                image_path = violation['image_path']
-                if image_path and not image_path.startswith('static/'):
-                    image_path = f"static/violations/{os.path.basename(image_path)}"
-                
-                # Verify image file exists
-                full_image_path = os.path.join(app.static_folder, 'violations', os.path.basename(image_path))
-                if not os.path.exists(full_image_path):
-                    continue
-                
-                formatted_violations.append({
-                    '_id': str(violation['_id']),
-                    'date': violation['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
-                    'license_plate': violation['license_plate'],
-                    'speed': violation['speed'],
-                    'image_path': image_path,
-                    'status': 'Violation' if violation['speed'] > 45 else 'Normal'  # Speed limit set to 45 km/h
-                })
+        formatted_violations = []
+        for violation in rows:
+            # Ensure image path is properly formatted for static file serving
+            image_path = violation['image_path']
+            if image_path and not image_path.startswith('static/'):
+                image_path = f"static/violations/{os.path.basename(image_path)}"
             
-        return render_template('violations.html', violations=formatted_violations)
+            formatted_violations.append({
+                '_id': str(violation['_id']),
+                'date': violation['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
+                'license_plate': violation['license_plate'],
+                'speed': violation['speed'],
+                'image_path': image_path,
+                'status': 'Violation' if violation['speed'] > 45 else 'Normal'  # Speed limit set to 45 km/h
+            })
+            
+        return render_template('violations.html', violations=formatted_violations, pagination=pagination)
     except Exception as e:
         flash(f'Error loading violations: {str(e)}', 'error')
         return redirect(url_for('dashboard'))
@@ -247,21 +334,20 @@ def violations():
 @login_required
 def processing_status():
     try:
-        # Get latest video status
-        latest_video = mongo.db.videos.find_one(
-            {'uploaded_by': str(current_user.id)},
-            sort=[('uploaded_at', -1)]
-        )
-        
-        if not latest_video:
+        # Status of the requested job, or of the user's latest upload
+        job_id = request.args.get('job_id')
+        if job_id:
+            video = mongo.db.videos.find_one({'_id': ObjectId(job_id)})
+        else:
+            video = mongo.db.videos.find_one(
+                {'uploaded_by': str(current_user.id)},
+                sort=[('uploaded_at', -1)]
+            )
+        
+        if not video:
             return jsonify({'status': 'no_video'})
             
-        return jsonify({
-            'status': latest_video.get('status', 'unknown'),
-            'progress': latest_video.get('progress', 0),
-            'error': latest_video.get('error_message'),
-            'detections': latest_video.get('detections', [])
-        })
+        return jsonify(video_job_status(video))
         
     except Exception as e:
         print(f"Status check error: {str(e)}")
@@ -298,8 +384,6 @@ def get_latest_violations():
 @login_required
 def upload_video():
     try:
-        global video_processing
-        
         if 'video' not in request.files:
             return jsonify({'error': 'No video file uploaded'}), 400
             
@@ -316,50 +400,60 @@ def upload_video():
         filepath = os.path.join(upload_dir, filename)
         video_file.save(filepath)
         
-        # Create a video document in MongoDB
+        # Create a video document in MongoDB; it also holds the job state
+        priority = request.form.get('priority', 0, type=int)
         video_data = {
             'filename': filename,
             'filepath': filepath,
             'uploaded_by': str(current_user.id),
             'uploaded_at': datetime.utcnow(),
-            'status': 'pending',
-            'progress': 0
+            'status': QUEUED,
+            'progress': 0,
+            'priority': priority
         }
-        mongo.db.videos.insert_one(video_data)
-        
-        # Initialize video processor and start processing
-        processor = VideoProcessor()
-        status_dict = {'progress': 0, 'status': 'processing'}
+        job_id = str(mongo.db.videos.insert_one(video_data).inserted_id)
         
-        # Start video processing in a separate thread
-        def process_video_async():
-            try:
-                global video_processing
-                video_processing = True
-                processor.process_video(filepath, status_dict)
-                mongo.db.videos.update_one(
-                    {'filepath': filepath},
-                    {'$set': {'status': 'completed'}}
-                )
-            except Exception as e:
-                mongo.db.videos.update_one(
-                    {'filepath': filepath},
-                    {'$set': {
-                        'status': 'error',
-                        'error_message': str(e)
-                    }}
-                )
-            finally:
-                video_processing = False
-        
-        thread = threading.Thread(target=process_video_async)
-        thread.start()
+        # Queue the video for the processing workers
+        try:
+            job_scheduler.submit(job_id, video_job(filepath), priority)
+        except queue.Full as e:
+            update_video_job(job_id, {'status': CANCELLED, 'error_message': str(e)})
+            return jsonify({'error': 'Too many videos waiting to be processed, try again later'}), 503
         
-        return jsonify({'success': True, 'message': 'Video upload successful, processing started'})
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'queue_position': job_scheduler.queue_position(job_id),
+            'message': 'Video upload successful, queued for processing'
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def current_user_is_admin():
+    """Whether the logged-in user has the admin role."""
+    role = getattr(current_user, 'role', None)
+    if role is None:
+        user = mongo.db.users.find_one({'_id': ObjectId(str(current_user.id))}, {'role': 1})
+        role = user.get('role') if user else None
+    return role == 'admin'
+
+@app.route('/cancel_job/<job_id>', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    try:
+        video = mongo.db.videos.find_one({'_id': ObjectId(job_id)}, {'uploaded_by': 1})
+        if not video:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        # Only the uploader or an admin may cancel a job
+        if video.get('uploaded_by') != str(current_user.id) and not current_user_is_admin():
+            return jsonify({'success': False, 'error': 'Not allowed to cancel this job'}), 403
+        if not job_scheduler.cancel(job_id):
+            return jsonify({'success': False, 'error': 'Job is not queued or running'}), 400
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/email_notifications')
 @login_required
 def email_notifications():
@@ -392,22 +486,14 @@ def resend_notification():
         if 'owner_email' not in violation:
             return jsonify({'success': False, 'error': 'No email address associated with this violation'})
         
-        send_violation_email(
-            violation['owner_email'],
-            violation['license_plate'],
-            violation['speed'],
-            violation['image_path']
+        # Sent in the background; the result is recorded in email_notifications
+        get_email_queue().send_violation_notification(
+            violation,
+            violation_id=violation_id,
+            image_path=violation.get('image_path')
         )
         
-        notification_data = {
-            'violation_id': violation_id,
-            'email': violation['owner_email'],
-            'status': 'sent',
-            'sent_date': datetime.utcnow()
-        }
-        mongo.db.email_notifications.insert_one(notification_data)
-        
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'message': 'Notification queued'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -415,22 +501,14 @@ def resend_notification():
 @login_required
 def reports():
     try:
-        # Get statistics for the reports page
-        total_violations = mongo.db.violations.count_documents({})
+        # Get statistics for the reports page from the daily rollups
+        counts = traffic_counts()
         recent_violations = list(mongo.db.violations.find().sort('timestamp', -1).limit(5))
         
-        # Calculate daily statistics
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        daily_violations = mongo.db.violations.count_documents({'timestamp': {'$gte': today}})
-        
-        # Calculate weekly statistics
-        week_ago = today - timedelta(days=7)
-        weekly_violations = mongo.db.violations.count_documents({'timestamp': {'$gte': week_ago}})
-        
         return render_template('reports.html',
-                             total_violations=total_violations,
-                             daily_violations=daily_violations,
-                             weekly_violations=weekly_violations,
+                             total_violations=counts['total_violations'],
+                             daily_violations=counts['daily_violations'],
+                             weekly_violations=counts['weekly_violations'],
                              recent_violations=recent_violations)
     except Exception as e:
         flash(f'Error loading reports: {str(e)}', 'error')
@@ -446,10 +524,15 @@ def delete_violation():
         if not violation_id:
             return jsonify({'success': False, 'error': 'No violation ID provided'})
             
-        result = mongo.db.violations.delete_one({'_id': ObjectId(violation_id)})
+        violation = mongo.db.violations.find_one_and_delete(
+            {'_id': ObjectId(violation_id)},
+            projection={'timestamp': 1, 'speed': 1, 'license_plate': 1}
+        )
         
-        if result.deleted_count == 0:
+        if violation is None:
             return jsonify({'success': False, 'error': 'Violation not found'})
+
+        apply_rollups([violation], sign=-1)
             
         return jsonify({'success': True})
     except Exception as e:
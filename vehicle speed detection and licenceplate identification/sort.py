@@ -4,6 +4,8 @@ SORT: A Simple, Online and Realtime Tracker
 import numpy as np
 from filterpy.kalman import KalmanFilter
 from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 from scipy.spatial.distance import cdist
 
 def linear_assignment(cost_matrix):
@@ -11,21 +13,27 @@ def linear_assignment(cost_matrix):
     return np.array(list(zip(x, y)))
 
 def iou_batch(bb_test, bb_gt):
-    bb_gt = np.expand_dims(bb_gt, 0)
-    bb_test = np.expand_dims(bb_test, 1)
-    
-    xx1 = np.maximum(bb_test[..., 0], bb_gt[..., 0])
-    yy1 = np.maximum(bb_test[..., 1], bb_gt[..., 1])
-    xx2 = np.minimum(bb_test[..., 2], bb_gt[..., 2])
-    yy2 = np.minimum(bb_test[..., 3], bb_gt[..., 3])
-    w = np.maximum(0., xx2 - xx1)
-    h = np.maximum(0., yy2 - yy1)
-    wh = w * h
-    o = wh / ((bb_test[..., 2] - bb_test[..., 0]) * (bb_test[..., 3] - bb_test[..., 1])                                      
-        + (bb_gt[..., 2] - bb_gt[..., 0]) * (bb_gt[..., 3] - bb_gt[..., 1]) - wh)                                              
-    return(o)
+    bb_test = np.asarray(bb_test, dtype=float)[:, :4]
+    bb_gt = np.asarray(bb_gt, dtype=float)[:, :4]
+    area_test = (bb_test[:, 2] - bb_test[:, 0]) * (bb_test[:, 3] - bb_test[:, 1])
+    area_gt = (bb_gt[:, 2] - bb_gt[:, 0]) * (bb_gt[:, 3] - bb_gt[:, 1])
+
+    # Intersection, computed in place to avoid N x M temporaries
+    w = np.minimum(bb_test[:, None, 2], bb_gt[None, :, 2])
+    w -= np.maximum(bb_test[:, None, 0], bb_gt[None, :, 0])
+    np.maximum(w, 0., out=w)
+    h = np.minimum(bb_test[:, None, 3], bb_gt[None, :, 3])
+    h -= np.maximum(bb_test[:, None, 1], bb_gt[None, :, 1])
+    np.maximum(h, 0., out=h)
+    wh = np.multiply(w, h, out=w)
+
+    union = area_test[:, None] + area_gt[None, :]
+    union -= wh
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.divide(wh, union, out=h)
 
 class KalmanBoxTracker(object):
+    """A single track with its own filter; Sort keeps its tracks in a KalmanBoxBank."""
     count = 0
     def __init__(self, bbox):
         self.kf = KalmanFilter(dim_x=7, dim_z=4)
@@ -86,72 +94,180 @@ def convert_x_to_bbox(x,score=None):
     else:
         return np.array([x[0]-w/2.,x[1]-h/2.,x[0]+w/2.,x[1]+h/2.,score]).reshape((1,5))
 
+def convert_bboxes_to_z(bboxes):
+    """convert_bbox_to_z for an (N, 4) array of boxes; returns (N, 4)."""
+    bboxes = np.asarray(bboxes, dtype=float)
+    w = bboxes[:, 2] - bboxes[:, 0]
+    h = bboxes[:, 3] - bboxes[:, 1]
+    return np.stack((bboxes[:, 0] + w/2., bboxes[:, 1] + h/2., w * h, w / h), axis=1)
+
+def convert_x_to_bboxes(x):
+    """convert_x_to_bbox for (N, 7) states; invalid states give NaN boxes."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w = np.sqrt(x[:, 2] * x[:, 3])
+        h = x[:, 2] / w
+    return np.stack((x[:, 0] - w/2., x[:, 1] - h/2., x[:, 0] + w/2., x[:, 1] + h/2.), axis=1)
+
+class KalmanBoxBank(object):
+    """The Kalman filters of every track, stored as stacked arrays.
+
+    Row i of x (N, 7) and P (N, 7, 7) is the state and covariance of track i,
+    with the same model as KalmanBoxTracker: all tracks share F, H, Q and R,
+    so predict and update run as one batched operation over the rows
+    instead of one small filter per track.
+    """
+    F = np.array([[1,0,0,0,1,0,0],[0,1,0,0,0,1,0],[0,0,1,0,0,0,1],[0,0,0,1,0,0,0],
+                  [0,0,0,0,1,0,0],[0,0,0,0,0,1,0],[0,0,0,0,0,0,1]], dtype=float)
+    H = np.eye(4, 7)
+    R = np.diag([1., 1., 10., 10.])
+    Q = np.diag([1., 1., 1., 1., 0.01, 0.01, 0.0001])
+    P0 = np.diag([10., 10., 10., 10., 10000., 10000., 10000.])
+
+    def __init__(self):
+        self.x = np.empty((0, 7))
+        self.P = np.empty((0, 7, 7))
+        self.ids = np.empty(0, dtype=int)
+        self.time_since_update = np.empty(0, dtype=int)
+        self.hits = np.empty(0, dtype=int)
+        self.hit_streak = np.empty(0, dtype=int)
+        self.age = np.empty(0, dtype=int)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, bboxes):
+        """Start a track for each box; ids continue KalmanBoxTracker.count."""
+        n = len(bboxes)
+        if n == 0:
+            return
+        x = np.zeros((n, 7))
+        x[:, :4] = convert_bboxes_to_z(bboxes)
+        self.x = np.concatenate((self.x, x))
+        self.P = np.concatenate((self.P, np.broadcast_to(self.P0, (n, 7, 7))))
+        self.ids = np.concatenate((self.ids, np.arange(KalmanBoxTracker.count, KalmanBoxTracker.count + n)))
+        KalmanBoxTracker.count += n
+        zeros = np.zeros(n, dtype=int)
+        self.time_since_update = np.concatenate((self.time_since_update, zeros))
+        self.hits = np.concatenate((self.hits, zeros))
+        self.hit_streak = np.concatenate((self.hit_streak, zeros))
+        self.age = np.concatenate((self.age, zeros))
+
+    def predict(self):
+        """Advance every track one frame; returns the predicted boxes (N, 4)."""
+        # Keep the predicted area from going negative
+        self.x[self.x[:, 6] + self.x[:, 2] <= 0, 6] = 0.
+        self.x = self.x @ self.F.T
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        self.age += 1
+        self.hit_streak[self.time_since_update > 0] = 0
+        self.time_since_update += 1
+        return self.get_state()
+
+    def update(self, indices, bboxes):
+        """Correct the tracks at indices with their matched boxes."""
+        if len(indices) == 0:
+            return
+        x = self.x[indices]
+        P = self.P[indices]
+        y = convert_bboxes_to_z(bboxes) - x @ self.H.T
+        PHT = P @ self.H.T
+        S = self.H @ PHT + self.R
+        K = PHT @ np.linalg.inv(S)
+        self.x[indices] = x + (K @ y[:, :, None])[:, :, 0]
+        # Joseph form, as filterpy does, to keep P symmetric positive definite
+        I_KH = np.eye(7) - K @ self.H
+        self.P[indices] = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ self.R @ K.transpose(0, 2, 1)
+        self.time_since_update[indices] = 0
+        self.hits[indices] += 1
+        self.hit_streak[indices] += 1
+
+    def get_state(self):
+        return convert_x_to_bboxes(self.x)
+
+    def keep(self, mask):
+        """Drop the tracks where mask is False."""
+        self.x = self.x[mask]
+        self.P = self.P[mask]
+        self.ids = self.ids[mask]
+        self.time_since_update = self.time_since_update[mask]
+        self.hits = self.hits[mask]
+        self.hit_streak = self.hit_streak[mask]
+        self.age = self.age[mask]
+
 class Sort(object):
     def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3):
         self.max_age = max_age
         self.min_hits = min_hits
         self.iou_threshold = iou_threshold
-        self.trackers = []
+        self.trackers = KalmanBoxBank()
         self.frame_count = 0
 
     def update(self, dets=np.empty((0, 5))):
         self.frame_count += 1
-        trks = np.zeros((len(self.trackers), 5))
-        to_del = []
-        ret = []
-        for t, trk in enumerate(trks):
-            pos = self.trackers[t].predict()[0]
-            trk[:] = [pos[0], pos[1], pos[2], pos[3], 0]
-            if np.any(np.isnan(pos)):
-                to_del.append(t)
-        trks = np.ma.compress_rows(np.ma.masked_invalid(trks))
-        for t in reversed(to_del):
-            self.trackers.pop(t)
+        trks = self.trackers.predict()
+        valid = ~np.any(np.isnan(trks), axis=1)
+        if not valid.all():
+            self.trackers.keep(valid)
+            trks = trks[valid]
         matched, unmatched_dets, unmatched_trks = associate_detections_to_trackers(dets, trks, self.iou_threshold)
 
-        for m in matched:
-            self.trackers[m[1]].update(dets[m[0], :])
-
-        for i in unmatched_dets:
-            trk = KalmanBoxTracker(dets[i,:])
-            self.trackers.append(trk)
-        i = len(self.trackers)
-        for trk in reversed(self.trackers):
-            d = trk.get_state()[0]
-            if (trk.time_since_update < 1) and (trk.hit_streak >= self.min_hits or self.frame_count <= self.min_hits):
-                ret.append(np.concatenate((d,[trk.id+1])).reshape(1,-1))
-            i -= 1
-            if(trk.time_since_update > self.max_age):
-                self.trackers.pop(i)
+        if len(matched):
+            self.trackers.update(matched[:, 1], dets[matched[:, 0], :4])
+        self.trackers.add(dets[np.asarray(unmatched_dets, dtype=int), :4])
+
+        # Newest tracks first, as they were reported by the per-tracker loop
+        bank = self.trackers
+        report = (bank.time_since_update < 1) & ((bank.hit_streak >= self.min_hits) | (self.frame_count <= self.min_hits))
+        ret = np.hstack((bank.get_state(), bank.ids[:, None] + 1))[report][::-1]
+        bank.keep(bank.time_since_update <= self.max_age)
         if(len(ret)>0):
-            return np.concatenate(ret)
+            return ret
         return np.empty((0,5))
 
 def associate_detections_to_trackers(detections, trackers, iou_threshold=0.3):
+    """Match detections to predicted tracks by IoU.
+
+    Pairs below iou_threshold can never be matched, so they are pruned
+    before solving: the remaining pairs form a sparse bipartite graph, and
+    the Hungarian solve runs on each of its connected components separately.
+    A component of a single pair is a match without any solve. Returns the
+    (det, trk) matches and the unmatched detection and tracker indices.
+    """
     if(len(trackers)==0):
         return np.empty((0,2),dtype=int), np.arange(len(detections)), np.empty((0,5),dtype=int)
     iou_matrix = iou_batch(detections, trackers)
-    if min(iou_matrix.shape) > 0:
-        matched_indices = linear_assignment(-iou_matrix)
-    else:
-        matched_indices = np.empty(shape=(0,2))
-    unmatched_detections = []
-    for d,det in enumerate(detections):
-        if(d not in matched_indices[:,0]):
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t,trk in enumerate(trackers):
-        if(t not in matched_indices[:,1]):
-            unmatched_trackers.append(t)
-    matches = []
-    for m in matched_indices:
-        if(iou_matrix[m[0], m[1]]<iou_threshold):
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1,2))
-    if(len(matches)==0):
-        matches = np.empty((0,2),dtype=int)
-    else:
-        matches = np.concatenate(matches,axis=0)
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
\ No newline at end of file
+    num_dets, num_trks = iou_matrix.shape
+    gated = iou_matrix >= iou_threshold
+    det_idx, trk_idx = np.nonzero(gated)
+
+    matches = np.empty((0,2),dtype=int)
+    if len(det_idx):
+        # Detections are nodes 0..D-1 and trackers D..D+T-1
+        graph = coo_matrix((np.ones(len(det_idx)), (det_idx, num_dets + trk_idx)),
+                           shape=(num_dets + num_trks, num_dets + num_trks))
+        _, labels = connected_components(graph, directed=False)
+        edge_labels = labels[det_idx]
+        single = np.bincount(edge_labels)[edge_labels] == 1
+        pairs = [np.stack((det_idx[single], trk_idx[single]), axis=1)]
+
+        shared = ~single
+        if shared.any():
+            order = np.argsort(edge_labels[shared], kind='stable')
+            comp_dets = det_idx[shared][order]
+            comp_trks = trk_idx[shared][order]
+            bounds = np.flatnonzero(np.diff(edge_labels[shared][order])) + 1
+            for dets, trks in zip(np.split(comp_dets, bounds), np.split(comp_trks, bounds)):
+                dets = np.unique(dets)
+                trks = np.unique(trks)
+                sub = np.where(gated[np.ix_(dets, trks)], iou_matrix[np.ix_(dets, trks)], 0.)
+                rows, cols = linear_sum_assignment(-sub)
+                # Pruned pairs may still be assigned when a side is left over
+                ok = gated[dets[rows], trks[cols]]
+                pairs.append(np.stack((dets[rows[ok]], trks[cols[ok]]), axis=1))
+        matches = np.concatenate(pairs).astype(int)
+
+    unmatched_dets = np.ones(num_dets, dtype=bool)
+    unmatched_dets[matches[:, 0]] = False
+    unmatched_trks = np.ones(num_trks, dtype=bool)
+    unmatched_trks[matches[:, 1]] = False
+    return matches, np.flatnonzero(unmatched_dets), np.flatnonzero(unmatched_trks)
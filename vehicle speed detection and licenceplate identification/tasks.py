@@ -1,52 +1,61 @@
 from celery import Celery
 from models import mongo
-import cv2
 import numpy as np
 from datetime import datetime
+from frame_scheduler import AdaptiveFrameScheduler
+from frame_source import FrameSource
+from utils.progress import ProgressReporter
+from utils.job_scheduler import RUNNING, DONE, FAILED
 
 celery = Celery('tasks', broker='redis://localhost:6379/0')
 
 @celery.task
 def process_video(video_path):
+    source = None
+    progress_reporter = None
     try:
         # Update status
         mongo.db.videos.update_one(
             {'filepath': video_path},
-            {'$set': {'status': 'processing'}}
+            {'$set': {'status': RUNNING}}
         )
         
         # Process video frames
-        cap = cv2.VideoCapture(video_path)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        source = FrameSource(video_path, seek_threshold=30)
+        total_frames = source.total_frames
         processed_frames = 0
+        scheduler = AdaptiveFrameScheduler()
+        stride = 1
+        # Progress is written in the background, at most every 2s and 1%
+        progress_reporter = ProgressReporter(
+            lambda fields: mongo.db.videos.update_one({'filepath': video_path}, {'$set': fields})
+        )
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
+        while True:
+            # Frames skipped by the scheduler are only grabbed, not decoded
+            item = source.read_next(stride)
+            if item is None:
                 break
             
-            # Your video processing logic here
-            # Example:
-            # - Detect license plate
-            # - Calculate speed
-            # - Check for violations
+            detect, stride = scheduler.schedule(item[2])
             
-            processed_frames += 1
-            progress = (processed_frames / total_frames) * 100
+            if detect:
+                # Your video processing logic here
+                # Example:
+                # - Detect license plate
+                # - Calculate speed (from the real frame gap since the last detection)
+                # - Check for violations
+                pass
             
-            # Update progress in database
-            mongo.db.videos.update_one(
-                {'filepath': video_path},
-                {'$set': {'progress': progress}}
-            )
-        
-        cap.release()
+            processed_frames = source.position
+            progress = (processed_frames / total_frames) * 100
+            progress_reporter.report(progress)
         
         # Mark as completed
         mongo.db.videos.update_one(
             {'filepath': video_path},
             {'$set': {
-                'status': 'completed',
+                'status': DONE,
                 'processed': True,
                 'completion_time': datetime.utcnow()
             }}
@@ -56,7 +65,13 @@ def process_video(video_path):
         mongo.db.videos.update_one(
             {'filepath': video_path},
             {'$set': {
-                'status': 'error',
+                'status': FAILED,
                 'error_message': str(e)
             }}
-        )
\ No newline at end of file
+        )
+    finally:
+        # Also on failure: free the capture and write the last progress
+        if progress_reporter is not None:
+            progress_reporter.close()
+        if source is not None:
+            source.release()
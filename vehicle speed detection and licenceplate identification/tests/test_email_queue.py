@@ -0,0 +1,74 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from utils.email_queue import EmailQueue
+
+controller = pytest.importorskip('aiosmtpd.controller')
+
+
+class RecordingHandler:
+    """Stores every message with the connection it came in on, and can drop
+    the connection after a message, as a server closing an idle session would."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = []
+        self.drop_next = False
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content)
+        if session not in self.sessions:
+            self.sessions.append(session)
+        if self.drop_next:
+            self.drop_next = False
+            asyncio.get_event_loop().call_later(0.05, server.transport.close)
+        return '250 Message accepted for delivery'
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    handler = RecordingHandler()
+    server = controller.Controller(handler, hostname='127.0.0.1', port=port)
+    server.start()
+    yield handler, '127.0.0.1', port
+    server.stop()
+
+
+def make_queue(host, port):
+    return EmailQueue(host=host, port=port, username=None, sender='monitor@example.com',
+                      use_tls=False, retry_delay=0.05, idle_timeout=30)
+
+
+def test_queued_messages_share_one_session(smtp_server):
+    handler, host, port = smtp_server
+    emails = make_queue(host, port)
+    for i in range(5):
+        emails.send(f'owner{i}@example.com', f'Violation {i}', 'Speed limit exceeded')
+
+    assert emails.flush(timeout=10)
+    assert (emails.sent, emails.failed) == (5, 0)
+    assert len(handler.messages) == 5
+    assert len(handler.sessions) == 1
+
+
+def test_reconnects_after_the_session_is_dropped(smtp_server):
+    handler, host, port = smtp_server
+    emails = make_queue(host, port)
+    handler.drop_next = True
+    emails.send('owner@example.com', 'Violation 1', 'Speed limit exceeded')
+    assert emails.flush(timeout=10)
+
+    # Let the server close the session the queue is still holding
+    time.sleep(0.3)
+    emails.send('owner@example.com', 'Violation 2', 'Speed limit exceeded')
+    assert emails.flush(timeout=10)
+
+    assert (emails.sent, emails.failed) == (2, 0)
+    assert len(handler.messages) == 2
+    assert len(handler.sessions) == 2
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+from frame_scheduler import AdaptiveFrameScheduler
+
+
+def still_frame():
+    return np.full((72, 128, 3), 100, dtype=np.uint8)
+
+
+def moving_frame(step):
+    frame = still_frame()
+    frame[:, (step * 16) % 128:(step * 16) % 128 + 16] = 255
+    return frame
+
+
+def test_first_frame_is_detected_at_the_base_stride():
+    scheduler = AdaptiveFrameScheduler(base_stride=5)
+    assert scheduler.schedule(still_frame()) == (True, 5)
+
+
+def test_empty_still_road_backs_off_to_max_stride():
+    scheduler = AdaptiveFrameScheduler(base_stride=2, max_stride=12, max_idle_frames=1000)
+    scheduler.schedule(still_frame())
+
+    plans = [scheduler.schedule(still_frame()) for _ in range(4)]
+    assert plans == [(False, 4), (False, 8), (False, 12), (False, 12)]
+
+
+def test_idle_road_is_still_detected_every_max_idle_frames():
+    scheduler = AdaptiveFrameScheduler(base_stride=5, max_stride=10, max_idle_frames=30)
+    scheduler.schedule(still_frame())
+
+    detected = []
+    for _ in range(8):
+        detect, _ = scheduler.schedule(still_frame())
+        detected.append(detect)
+    # Strides 5, 10, 10, 10: the idle frames reach 30 on the fourth candidate
+    assert detected == [False, False, False, True, False, False, True, False]
+
+
+def test_motion_and_tracks_set_the_stride():
+    scheduler = AdaptiveFrameScheduler(base_stride=5, min_stride=1, busy_tracks=8)
+    scheduler.schedule(moving_frame(0))
+
+    assert scheduler.schedule(moving_frame(1)) == (True, 5)
+    assert scheduler.schedule(still_frame(), active_tracks=2) == (True, 5)
+    assert scheduler.schedule(still_frame(), active_tracks=8) == (True, 1)
+
+
+def test_lag_stretches_the_stride():
+    scheduler = AdaptiveFrameScheduler(base_stride=4, max_stride=15, lag_threshold=0.5)
+    scheduler.schedule(still_frame())
+
+    assert scheduler.schedule(still_frame(), active_tracks=1, lag=0.4) == (True, 4)
+    assert scheduler.schedule(still_frame(), active_tracks=1, lag=1.0) == (True, 8)
+    assert scheduler.schedule(still_frame(), active_tracks=1, lag=3.0) == (True, 15)
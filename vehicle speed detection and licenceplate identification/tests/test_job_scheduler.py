@@ -0,0 +1,175 @@
+import queue
+import threading
+
+from utils.job_scheduler import JobScheduler, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+
+
+class Recorder:
+    """on_update callback keeping every update and signalling final states."""
+
+    def __init__(self):
+        self.updates = []
+        self.finished = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, job_id, fields):
+        with self.lock:
+            self.updates.append((job_id, dict(fields)))
+            if fields.get('status') in (DONE, FAILED, CANCELLED):
+                self.finished.setdefault(job_id, threading.Event()).set()
+
+    def wait(self, job_id, timeout=5):
+        with self.lock:
+            event = self.finished.setdefault(job_id, threading.Event())
+        assert event.wait(timeout), f"job {job_id} did not finish"
+
+    def statuses(self, job_id):
+        return [fields['status'] for id_, fields in self.updates
+                if id_ == job_id and 'status' in fields]
+
+    def last(self, job_id):
+        return [fields for id_, fields in self.updates if id_ == job_id][-1]
+
+
+def blocking_job():
+    """A job that runs until released, so later jobs stay queued."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def target(status_dict):
+        started.set()
+        release.wait(5)
+        return True
+    return target, started, release
+
+
+def test_successful_job_goes_queued_running_done():
+    recorder = Recorder()
+    scheduler = JobScheduler(on_update=recorder)
+    scheduler.submit('a', lambda status_dict: True)
+    recorder.wait('a')
+
+    assert recorder.statuses('a') == [QUEUED, RUNNING, DONE]
+    assert recorder.last('a')['progress'] == 100
+    assert 'finished_at' in recorder.last('a')
+    assert scheduler.get('a') is None
+
+
+def test_failed_and_raising_jobs_are_marked_failed():
+    def raises(status_dict):
+        raise RuntimeError('bad codec')
+
+    recorder = Recorder()
+    scheduler = JobScheduler(on_update=recorder)
+    scheduler.submit('false', lambda status_dict: False)
+    scheduler.submit('raises', raises)
+    recorder.wait('false')
+    recorder.wait('raises')
+
+    assert recorder.last('false')['status'] == FAILED
+    assert recorder.last('raises')['status'] == FAILED
+    assert recorder.last('raises')['error_message'] == 'bad codec'
+
+
+def test_higher_priority_runs_first_then_submission_order():
+    recorder = Recorder()
+    scheduler = JobScheduler(on_update=recorder)
+    target, started, release = blocking_job()
+    scheduler.submit('blocker', target)
+    assert started.wait(5)
+
+    ran = []
+    for job_id, priority in [('low-1', 0), ('high', 5), ('low-2', 0)]:
+        scheduler.submit(job_id, lambda status_dict, job_id=job_id: ran.append(job_id), priority)
+
+    assert scheduler.get('high') == {'status': QUEUED, 'progress': 0, 'queue_position': 1}
+    assert scheduler.queue_position('low-1') == 2
+    assert scheduler.queue_position('low-2') == 3
+    assert scheduler.get('blocker')['status'] == RUNNING
+    assert scheduler.queue_position('blocker') is None
+
+    release.set()
+    recorder.wait('low-2')
+    assert ran == ['high', 'low-1', 'low-2']
+
+
+def test_submit_raises_when_queue_is_full():
+    scheduler = JobScheduler(max_queued=2)
+    target, started, release = blocking_job()
+    scheduler.submit('blocker', target)
+    assert started.wait(5)
+    scheduler.submit('a', lambda status_dict: True)
+    scheduler.submit('b', lambda status_dict: True)
+
+    try:
+        scheduler.submit('c', lambda status_dict: True)
+        assert False, "expected queue.Full"
+    except queue.Full:
+        pass
+    finally:
+        release.set()
+    assert scheduler.get('c') is None
+
+
+def test_cancelling_a_queued_job_drops_it():
+    recorder = Recorder()
+    scheduler = JobScheduler(on_update=recorder)
+    target, started, release = blocking_job()
+    scheduler.submit('blocker', target)
+    assert started.wait(5)
+
+    ran = []
+    scheduler.submit('queued', lambda status_dict: ran.append('queued'))
+    assert scheduler.cancel('queued') is True
+    assert scheduler.get('queued') is None
+    assert scheduler.queued_count() == 0
+
+    release.set()
+    recorder.wait('blocker')
+    scheduler.submit('after', lambda status_dict: True)
+    recorder.wait('after')
+    assert ran == []
+    assert recorder.statuses('queued') == [QUEUED, CANCELLED]
+
+
+def test_cancelling_a_running_job_flags_it_and_ends_cancelled():
+    recorder = Recorder()
+    scheduler = JobScheduler(on_update=recorder)
+    started = threading.Event()
+
+    def target(status_dict):
+        started.set()
+        while not status_dict.get('cancelled'):
+            threading.Event().wait(0.01)
+        return False
+
+    scheduler.submit('running', target)
+    assert started.wait(5)
+    assert scheduler.cancel('running') is True
+    recorder.wait('running')
+
+    assert recorder.statuses('running') == [QUEUED, RUNNING, CANCELLED]
+
+
+def test_cancelling_an_unknown_job_returns_false():
+    assert JobScheduler().cancel('missing') is False
+
+
+def test_resume_queues_jobs_and_cancels_the_overflow():
+    recorder = Recorder()
+    scheduler = JobScheduler(max_queued=1, on_update=recorder)
+    target, started, release = blocking_job()
+    scheduler.submit('running', target)
+    assert started.wait(5)
+
+    resumed = scheduler.resume([
+        ('second', lambda status_dict: True, 0),
+        ('third', lambda status_dict: True, 0),
+    ])
+    assert resumed == 1
+
+    release.set()
+    recorder.wait('second')
+    recorder.wait('third')
+    assert recorder.last('second')['status'] == DONE
+    assert recorder.last('third') == {'status': CANCELLED, 'error_message': 'Job queue full after restart'}
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+from utils.ocr_cache import PlateOCRCache, hamming, hash_bands, plate_hash
+
+PLATE_HASH = 0x0123456789ABCDEF
+
+
+def flip(crop_hash, *bits):
+    for bit in bits:
+        crop_hash ^= 1 << bit
+    return crop_hash
+
+
+def test_hashes_within_max_distance_share_a_band():
+    count = 5
+    bands = set(hash_bands(PLATE_HASH, count))
+    assert len(bands) == count
+    # Four bits spread over four bands still leave the fifth one intact
+    near = flip(PLATE_HASH, 0, 13, 26, 39)
+    assert bands & set(hash_bands(near, count))
+
+
+def test_plate_hash_is_stable_for_the_same_crop():
+    crop = np.tile(np.arange(0, 256, 8, dtype=np.uint8), (20, 3))
+    assert hamming(plate_hash(crop), plate_hash(crop.copy())) == 0
+
+
+def test_near_crop_of_the_same_track_hits():
+    cache = PlateOCRCache(max_distance=4)
+    cache.put((1, PLATE_HASH), 'AB-1234', 0.9)
+
+    assert cache.get((1, flip(PLATE_HASH, 3, 17, 40, 50, 63))) is None
+    assert cache.get((1, flip(PLATE_HASH, 3, 17, 40, 63))) == ('AB-1234', 0.9)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lookup_returns_the_closest_entry():
+    cache = PlateOCRCache(max_distance=4)
+    cache.put((1, flip(PLATE_HASH, 1, 2, 3)), 'AB-1284', 0.5)
+    cache.put((1, flip(PLATE_HASH, 5)), 'AB-1234', 0.8)
+
+    assert cache.get((1, PLATE_HASH)) == ('AB-1234', 0.8)
+
+
+def test_readings_are_kept_per_track():
+    cache = PlateOCRCache()
+    cache.put((1, PLATE_HASH), 'AB-1234', 0.9)
+    cache.put((None, PLATE_HASH), 'CD-5678', 0.9)
+
+    assert cache.get((2, PLATE_HASH)) is None
+    assert cache.get((None, PLATE_HASH)) is None
+
+
+def test_evicted_entries_leave_the_band_index():
+    cache = PlateOCRCache(max_entries=2)
+    cache.put((1, PLATE_HASH), 'AB-1234', 0.9)
+    cache.put((1, flip(PLATE_HASH, 30, 31, 32, 33, 34, 35)), 'AB-1235', 0.9)
+    cache.put((1, flip(PLATE_HASH, 60, 61, 62, 63, 20, 21)), 'AB-1236', 0.9)
+
+    assert cache.get((1, flip(PLATE_HASH, 0))) is None
+    indexed = {key for keys in cache._bands.values() for key in keys}
+    assert indexed == set(cache._entries)
+
+
+def test_track_becomes_stable_from_ocr_votes_only():
+    cache = PlateOCRCache(stable_votes=3, min_share=0.6)
+    cache.put((1, PLATE_HASH), 'AB-1234', 0.9)
+    # Cache hits are not new readings
+    for bit in range(3):
+        assert cache.get((1, flip(PLATE_HASH, bit))) is not None
+    assert cache.stable_reading(1) is None
+
+    cache.put((1, flip(PLATE_HASH, 20, 21, 22, 23, 24, 25)), 'AB-1234', 0.7)
+    cache.put((1, flip(PLATE_HASH, 40, 41, 42, 43, 44, 45)), 'AB-1284', 0.2)
+    assert cache.stable_reading(1) is None
+    cache.put((1, flip(PLATE_HASH, 50, 51, 52, 53, 54, 55)), 'AB-1234', 0.8)
+    assert cache.stable_reading(1) == ('AB-1234', pytest.approx(0.8))
+
+
+def test_readings_that_do_not_vote_never_settle_a_track():
+    cache = PlateOCRCache(stable_votes=1)
+    cache.put((1, PLATE_HASH), 'AB', 0.9, vote=False)
+    assert cache.stable_reading(1) is None
+
+    cache.put((2, PLATE_HASH), 'AB-1234', 0.9)
+    cache.forget(2)
+    assert cache.stable_reading(2) is None
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson.objectid import ObjectId
+
+from utils.pagination import decode_cursor, encode_cursor, keyset_page
+
+mongomock = pytest.importorskip('mongomock')
+
+START = datetime(2026, 3, 2, 8, 0, 0, 250000)
+FIELDS = {'timestamp': 1, 'speed': 1}
+
+
+@pytest.fixture
+def violations():
+    collection = mongomock.MongoClient().monitoring.violations
+    # Pairs of violations share a timestamp, so _id breaks the ties
+    collection.insert_many([
+        {'_id': ObjectId(), 'timestamp': START + timedelta(seconds=i // 2), 'speed': 50 + i}
+        for i in range(7)
+    ])
+    return collection
+
+
+def newest_first(collection):
+    return [v['_id'] for v in collection.find().sort([('timestamp', -1), ('_id', -1)])]
+
+
+def ids(rows):
+    return [row['_id'] for row in rows]
+
+
+def test_cursor_round_trip():
+    violation = {'_id': ObjectId(), 'timestamp': START}
+    assert decode_cursor(encode_cursor(violation)) == (START, violation['_id'])
+
+
+def test_pages_back_and_forth(violations):
+    expected = newest_first(violations)
+
+    first, pagination = keyset_page(violations, {}, FIELDS, 3)
+    assert ids(first) == expected[:3]
+    assert pagination['first_page'] and pagination['newer'] is None
+
+    second, pagination = keyset_page(violations, {}, FIELDS, 3, before=pagination['older'])
+    assert ids(second) == expected[3:6]
+    assert not pagination['first_page']
+
+    last, last_pagination = keyset_page(violations, {}, FIELDS, 3, before=pagination['older'])
+    assert ids(last) == expected[6:]
+    assert last_pagination['older'] is None
+
+    # Back towards the newest violations
+    back, pagination = keyset_page(violations, {}, FIELDS, 3, after=last_pagination['newer'])
+    assert ids(back) == expected[3:6]
+    assert pagination['older'] is not None and not pagination['first_page']
+
+    top, pagination = keyset_page(violations, {}, FIELDS, 3, after=pagination['newer'])
+    assert ids(top) == expected[:3]
+    assert pagination['first_page'] and pagination['newer'] is None
+
+
+def test_skips_rows_that_are_not_kept(violations):
+    rows, _ = keyset_page(violations, {}, FIELDS, 10, keep=lambda v: v['speed'] % 2 == 0)
+    assert [row['speed'] for row in rows] == [56, 54, 52, 50]
+
+
+def test_applies_the_query(violations):
+    rows, pagination = keyset_page(violations, {'speed': {'$gte': 55}}, FIELDS, 10)
+    assert [row['speed'] for row in rows] == [56, 55]
+    assert pagination['older'] is None
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils import rollups
+
+mongomock = pytest.importorskip('mongomock')
+
+DAY = datetime(2026, 3, 2)
+
+
+class BulkCollection:
+    """A mongomock collection whose bulk_write applies UpdateOne requests one
+    at a time (mongomock's own does not accept this pymongo's requests)."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    @property
+    def database(self):
+        return BulkDatabase(self._collection.database)
+
+    def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self._collection.update_one(request._filter, request._doc, upsert=request._upsert)
+
+
+class BulkDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return BulkCollection(self._database[name])
+
+
+@pytest.fixture
+def db():
+    database = mongomock.MongoClient().monitoring
+    return database.violations, BulkCollection(database.violation_rollups)
+
+
+def violation(hour, speed, plate='AB-1234', day=DAY):
+    return {'timestamp': day.replace(hour=hour), 'speed': speed, 'license_plate': plate}
+
+
+def test_day_rollup_sums_the_day_by_hour_and_plate():
+    rollup = rollups.day_rollup('2026-03-02', [
+        violation(8, 60), violation(8, 80, 'CD-5678'), violation(17, 70), {'speed': 99}
+    ])
+
+    assert (rollup['count'], rollup['speed_sum'], rollup['max_speed']) == (3, 210, 80)
+    assert rollup['hours'] == {
+        '08': {'count': 2, 'speed_sum': 140, 'max_speed': 80},
+        '17': {'count': 1, 'speed_sum': 70, 'max_speed': 70}
+    }
+    assert rollup['plates'] == {'AB-1234': 2, 'CD-5678': 1}
+
+
+def test_apply_rollups_adds_and_removes(db):
+    _, collection = db
+    stored = [violation(8, 60), violation(9, 80), violation(9, 90, day=DAY + timedelta(days=1))]
+    rollups.apply_rollups(stored, collection=collection)
+    rollups.apply_rollups(stored[:1], sign=-1, collection=collection)
+
+    day = collection.find_one({'_id': '2026-03-02'})
+    assert (day['count'], day['speed_sum']) == (1, 80)
+    assert day['hours']['08']['count'] == 0
+    assert day['plates'] == {'AB-1234': 1}
+    assert collection.find_one({'_id': '2026-03-03'})['count'] == 1
+
+
+def test_refresh_counts_every_violation_of_an_open_day(db):
+    violations, collection = db
+    violations.insert_many([violation(8, 60), violation(9, 80)])
+    now = DAY.replace(hour=12)
+
+    rollups.refresh_rollups(DAY, DAY + timedelta(days=1), violations, collection, now=now)
+    assert collection.find_one({'_id': '2026-03-02'})['count'] == 2
+
+    # Written by any code path: picked up once the refresh interval has passed
+    violations.insert_one(violation(10, 70))
+    rollups.refresh_rollups(DAY, DAY + timedelta(days=1), violations, collection, now=now + timedelta(seconds=1))
+    assert collection.find_one({'_id': '2026-03-02'})['count'] == 2
+    later = now + timedelta(seconds=rollups.REFRESH_INTERVAL)
+    rollups.refresh_rollups(DAY, DAY + timedelta(days=1), violations, collection, now=later)
+    assert collection.find_one({'_id': '2026-03-02'})['count'] == 3
+
+
+def test_refresh_closes_a_day_after_the_close_delay(db):
+    violations, collection = db
+    violations.insert_one(violation(23, 60))
+    closing = DAY + timedelta(days=1) + rollups.CLOSE_DELAY
+    rollups.refresh_rollups(DAY, DAY + timedelta(days=1), violations, collection, now=closing)
+
+    violations.insert_one(violation(23, 90))
+    rollups.refresh_rollups(DAY, DAY + timedelta(days=1), violations, collection,
+                            now=closing + timedelta(hours=1))
+    assert collection.find_one({'_id': '2026-03-02'})['count'] == 1
+
+
+def test_refresh_stores_empty_days_and_skips_the_future(db):
+    violations, collection = db
+    rollups.refresh_rollups(DAY, DAY + timedelta(days=5), violations, collection,
+                            now=DAY + timedelta(days=1, hours=1))
+
+    assert [day['_id'] for day in collection.find().sort('_id', 1)] == ['2026-03-02', '2026-03-03']
+    assert rollups.count_violations(DAY, DAY + timedelta(days=5), collection, violations) == 0
+
+
+def test_backfill_rebuilds_and_closes_past_days(db):
+    violations, collection = db
+    violations.insert_many([violation(8, 60), violation(9, 80),
+                            violation(9, 90, 'CD-5678', DAY + timedelta(days=1))])
+    collection.insert_one({'_id': '2026-03-02', 'count': 41})
+
+    assert rollups.backfill_rollups(violations, batch_size=2, collection=collection) == 3
+    days = list(collection.find().sort('_id', 1))
+    assert [(day['_id'], day['count'], day['speed_sum']) for day in days] == [
+        ('2026-03-02', 2, 140), ('2026-03-03', 1, 90)
+    ]
+    assert all(day['refreshed_at'] > DAY + timedelta(days=2) for day in days)
+    assert rollups.count_violations(collection=collection, violations=violations) == 3
+
+
+def test_backfill_of_no_violations_clears_the_rollups(db):
+    violations, collection = db
+    collection.insert_one({'_id': '2026-03-02', 'count': 5})
+
+    assert rollups.backfill_rollups(violations, collection=collection) == 0
+    assert collection.count_documents({}) == 0
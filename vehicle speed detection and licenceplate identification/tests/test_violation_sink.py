@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from utils.violation_sink import ViolationSink
+
+mongomock = pytest.importorskip('mongomock')
+
+
+class RecordingCollection:
+    """A mongomock collection recording its insert_many calls, failing the
+    first `failures` of them."""
+
+    def __init__(self, failures=0, store_before_failing=False):
+        self.collection = mongomock.MongoClient().db.violations
+        self.failures = failures
+        self.store_before_failing = store_before_failing
+        self.calls = []
+
+    def insert_many(self, documents, ordered=True):
+        self.calls.append([document['_id'] for document in documents])
+        if len(self.calls) <= self.failures:
+            if self.store_before_failing:
+                # The write went through but the reply was lost
+                self.collection.insert_many(documents, ordered=ordered)
+            raise AutoReconnect('connection lost')
+        return self.collection.insert_many(documents, ordered=ordered)
+
+
+def make_sink(collection, **options):
+    options.setdefault('retry_delay', 0.01)
+    return ViolationSink(collection=collection, **options)
+
+
+def test_batches_by_size():
+    collection = RecordingCollection()
+    sink = make_sink(collection, batch_size=3, flush_interval=30)
+    for speed in range(6):
+        sink.add({'speed': speed})
+
+    assert sink.flush(timeout=5)
+    assert [len(call) for call in collection.calls] == [3, 3]
+    assert collection.collection.count_documents({}) == 6
+    assert sink.inserted == 6
+
+
+def test_batches_by_interval():
+    collection = RecordingCollection()
+    sink = make_sink(collection, batch_size=100, flush_interval=0.1)
+    sink.add({'speed': 1})
+    sink.add({'speed': 2})
+    assert sink.flush(timeout=5)
+    sink.add({'speed': 3})
+    assert sink.flush(timeout=5)
+
+    assert [len(call) for call in collection.calls] == [2, 1]
+    assert collection.collection.count_documents({}) == 3
+
+
+def test_retries_failed_batch():
+    collection = RecordingCollection(failures=2)
+    sink = make_sink(collection, flush_interval=0.05, max_retries=3)
+    violation_id = sink.add({'speed': 90})
+
+    assert sink.flush(timeout=5)
+    assert collection.calls == [[violation_id]] * 3
+    assert collection.collection.find_one({'_id': violation_id})['speed'] == 90
+    assert (sink.inserted, sink.dropped) == (1, 0)
+
+
+def test_drops_batch_after_max_retries():
+    collection = RecordingCollection(failures=10)
+    sink = make_sink(collection, flush_interval=0.05, max_retries=3)
+    sink.add({'speed': 90})
+    sink.add({'speed': 95})
+
+    assert sink.flush(timeout=5)
+    assert len(collection.calls) == 3
+    assert collection.collection.count_documents({}) == 0
+    assert (sink.inserted, sink.dropped) == (0, 2)
+
+
+def test_duplicate_keys_from_an_earlier_attempt_count_as_stored():
+    collection = RecordingCollection(failures=1, store_before_failing=True)
+    sink = make_sink(collection, flush_interval=0.05)
+    first = sink.add({'speed': 90})
+    second = sink.add({'speed': 95})
+
+    assert sink.flush(timeout=5)
+    # The retry hit a BulkWriteError made only of duplicate keys
+    assert collection.calls == [[first, second]] * 2
+    assert collection.collection.count_documents({}) == 2
+    assert (sink.inserted, sink.dropped) == (2, 0)
+
+
+def test_other_bulk_write_errors_are_retried():
+    class RejectingCollection(RecordingCollection):
+        def insert_many(self, documents, ordered=True):
+            self.calls.append([document['_id'] for document in documents])
+            raise BulkWriteError({'writeErrors': [{'index': 0, 'code': 121,
+                                                   'errmsg': 'Document failed validation'}]})
+
+    collection = RejectingCollection()
+    sink = make_sink(collection, flush_interval=0.05, max_retries=2)
+    sink.add({'speed': 90})
+
+    assert sink.flush(timeout=5)
+    assert len(collection.calls) == 2
+    assert (sink.inserted, sink.dropped) == (0, 1)
+
+
+def test_flush_times_out_while_the_database_blocks():
+    release = threading.Event()
+
+    class BlockingCollection(RecordingCollection):
+        def insert_many(self, documents, ordered=True):
+            release.wait(5)
+            return super().insert_many(documents, ordered)
+
+    sink = make_sink(BlockingCollection(), flush_interval=0.01)
+    sink.add({'speed': 90})
+    assert not sink.flush(timeout=0.1)
+
+    release.set()
+    assert sink.flush(timeout=5)
@@ -1,123 +1,121 @@
 import numpy as np
-from kalman_filter import KalmanFilter
+from collections import deque
+from kalman_filter import DEFAULT_DT, KalmanFilterBank
 from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
 from datetime import datetime
 
 class Track(object):
-   
 
-    def __init__(self, prediction, trackIdCount):
-        
+
+    def __init__(self, prediction, trackIdCount, max_trace_length=20):
+
         self.track_id = trackIdCount  # identification of each track object
-        self.KF = KalmanFilter()  # KF instance to track this object
         self.prediction = np.asarray(prediction)  # predicted centroids (x,y)
+        self.velocity = np.zeros(2)  # estimated velocity (vx,vy), pixels/s
         self.skipped_frames = 0  # number of frames skipped undetected
-        self.trace = []  # trace path
+        self.trace = deque(maxlen=max_trace_length + 1)  # trace path
         self.start_time = datetime.utcnow()
         self.passed = False
 
 
 class Tracker(object):
-    
+    """Centroid tracker.
+
+    The Kalman filters of all tracks live in one KalmanFilterBank whose
+    rows follow the order of self.tracks, so every frame runs one batched
+    predict and correct instead of one small filter per track.
+
+    Each track follows a constant-velocity model; pass the frame timestamps
+    to update() and the tracks move by the real time elapsed, so frames can
+    be sampled sparsely. Without timestamps, frames are dt seconds apart.
+    """
 
     def __init__(self, dist_thresh, max_frames_to_skip, max_trace_length,
-                 trackIdCount):
-        
+                 trackIdCount, dt=DEFAULT_DT):
+
         self.dist_thresh = dist_thresh
         self.max_frames_to_skip = max_frames_to_skip
         self.max_trace_length = max_trace_length
         self.tracks = []
         self.trackIdCount = trackIdCount
-
-    def update(self, detections):
-       
+        self.dt = dt
+        self.last_timestamp = None
+        self.KF = KalmanFilterBank(dt)
+
+    def add_tracks(self, detections):
+        for detection in detections:
+            track = Track(detection.reshape(2, 1), self.trackIdCount, self.max_trace_length)
+            track.trace.append(track.prediction)
+            self.tracks.append(track)
+            self.trackIdCount += 1
+        self.KF.add(detections)
+
+    def update(self, detections, timestamp=None):
+        """Track the detected centroids of a frame taken at timestamp
+        (seconds, or a datetime)."""
+
+        # Detections as an (M, 2) array of centroids
+        detections = np.asarray(detections, dtype=float).reshape(-1, 2)
+
+        # Time elapsed since the previous frame
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+        dt = self.dt
+        if timestamp is not None:
+            if self.last_timestamp is not None:
+                dt = max(timestamp - self.last_timestamp, 0.)
+            self.last_timestamp = timestamp
 
         # Create tracks if no tracks vector found
         if len(self.tracks) == 0:
-            for i in range(len(detections)):
-                track = Track(detections[i], self.trackIdCount)
-                self.trackIdCount += 1
-                self.tracks.append(track)
+            self.add_tracks(detections)
+            return
 
-        # Calculate cost using sum of square distance between
-        # predicted vs detected centroids
+        # Calculate cost using distance between predicted vs detected
+        # centroids, halved
         N = len(self.tracks)
-        M = len(detections)
-        cost = np.zeros(shape=(N, M))   # Cost matrix
-        for i in range(len(self.tracks)):
-            for j in range(len(detections)):
-                try:
-                    diff = self.tracks[i].prediction - detections[j]
-                    distance = np.sqrt(diff[0]*diff[0] +
-                                       diff[1]*diff[1])
-                    cost[i][j] = distance
-                except:
-                    pass
-
-        # Let's average the squared ERROR
-        cost = (0.5) * cost
+        predictions = self.KF.predict(dt)
+        cost = 0.5 * cdist(predictions, detections)
+
         # Using Hungarian Algorithm assign the correct detected measurements
         # to predicted tracks
-        assignment = [-1 for _ in range(N)]
-        # for _ in range(N):
-        #     assignment.append(-1)
+        assignment = np.full(N, -1)
         row_ind, col_ind = linear_sum_assignment(cost)
-        for i in range(len(row_ind)):
-            assignment[row_ind[i]] = col_ind[i]
-
-        # Identify tracks with no assignment, if any
-        un_assigned_tracks = []
-        for i in range(len(assignment)):
-            if assignment[i] != -1:
-                # check for cost distance threshold.
-                # If cost is very high then un_assign (delete) the track
-                if cost[i][assignment[i]] > self.dist_thresh:
-                    assignment[i] = -1
-                    un_assigned_tracks.append(i)
-                pass
-            else:
-                self.tracks[i].skipped_frames += 1
-
-        del_tracks = [i for i in range(len(self.tracks)) if self.tracks[i].skipped_frames > self.max_frames_to_skip]
-        
-        if len(del_tracks) > 0:  # only when skipped frame exceeds max
-            for id in del_tracks:
-                if id < len(self.tracks):
-                    del self.tracks[id]
-                    del assignment[id]
-                else:
-                    print("ERROR: id is greater than length of tracks")
-
-        # Now look for un_assigned detects
-        un_assigned_detects = [i for i in range(len(detections)) if i not in assignment]
-        # for i in range(len(detections)):
-        #         if i not in assignment:
-        #             un_assigned_detects.append(i)
-
-        # Start new tracks
-        if len(un_assigned_detects) != 0:
-            for i in range(len(un_assigned_detects)):
-                track = Track(detections[un_assigned_detects[i]],
-                              self.trackIdCount)
-                self.trackIdCount += 1
-                self.tracks.append(track)
-
-        
-        for i in range(len(assignment)):
-            self.tracks[i].KF.predict()
-
-            if assignment[i] != -1:
-                self.tracks[i].skipped_frames = 0
-                self.tracks[i].prediction = self.tracks[i].KF.correct(
-                                            detections[assignment[i]], 1)
-            else:
-                self.tracks[i].prediction = self.tracks[i].KF.correct(
-                                            np.array([[0], [0]]), 0)
-
-            if len(self.tracks[i].trace) > self.max_trace_length:
-                for j in range(len(self.tracks[i].trace) -
-                               self.max_trace_length):
-                    del self.tracks[i].trace[j]
-
-            self.tracks[i].trace.append(self.tracks[i].prediction)
-            self.tracks[i].KF.lastResult = self.tracks[i].prediction
\ No newline at end of file
+        assignment[row_ind] = col_ind
+
+        # Assignments above the distance threshold are dropped; tracks with
+        # no assignment at all skip a frame
+        assigned = assignment != -1
+        too_far = assigned.copy()
+        too_far[assigned] = cost[assigned, assignment[assigned]] > self.dist_thresh
+        assignment[too_far] = -1
+        skipped = np.array([track.skipped_frames for track in self.tracks]) + ~assigned
+
+        # Remove tracks whose skipped frames exceed the maximum
+        keep = skipped <= self.max_frames_to_skip
+        if not keep.all():
+            self.tracks = [track for track, kept in zip(self.tracks, keep) if kept]
+            self.KF.keep(keep)
+            assignment = assignment[keep]
+            skipped = skipped[keep]
+
+        # Start new tracks for the un_assigned detects
+        un_assigned = np.ones(len(detections), dtype=bool)
+        un_assigned[assignment[assignment != -1]] = False
+
+        # Correct the matched tracks together; the others keep their prediction
+        matched = assignment != -1
+        measurements = np.zeros((len(assignment), 2))
+        measurements[matched] = detections[assignment[matched]]
+        positions = self.KF.correct(measurements, matched).copy()
+        velocities = self.KF.velocity.copy()
+        skipped[matched] = 0
+
+        for track, position, velocity, frames in zip(self.tracks, positions, velocities, skipped):
+            track.skipped_frames = int(frames)
+            track.prediction = position.reshape(2, 1)
+            track.velocity = velocity
+            track.trace.append(track.prediction)
+
+        self.add_tracks(detections[un_assigned])
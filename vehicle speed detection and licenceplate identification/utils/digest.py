@@ -0,0 +1,159 @@
+import atexit
+import os
+import threading
+import time
+
+import cv2
+
+from config.email_config import DIGEST_WINDOW
+from utils.email_queue import get_email_queue
+
+_digest = None
+_digest_lock = threading.Lock()
+
+
+class ViolationDigest:
+    """Group violation notices per owner and send one email per window.
+
+    The first violation of an owner opens a window of `window` seconds;
+    everything recorded for that owner until it closes goes out as a single
+    message listing every incident, with a small thumbnail of each evidence
+    image (the first max_thumbnails of them). One email_notifications record
+    covers the whole digest.
+
+    The scheduler thread started by start() checks for closed windows every
+    check_interval seconds.
+    """
+
+    def __init__(self, email_queue=None, window=DIGEST_WINDOW, max_thumbnails=10,
+                 thumbnail_width=320, check_interval=None):
+        self.email_queue = email_queue or get_email_queue()
+        self.window = window
+        self.max_thumbnails = max_thumbnails
+        self.thumbnail_width = thumbnail_width
+        self.check_interval = check_interval or max(1.0, min(30.0, window / 4))
+        self.digests_sent = 0
+        self._pending = {}  # recipient -> {'opened': time, 'incidents': [...]}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add(self, violation_data, violation_id=None, image_path=None):
+        """Record a violation for the digest of its owner."""
+        recipient = violation_data['owner_email']
+        with self._lock:
+            digest = self._pending.setdefault(recipient, {'opened': time.monotonic(), 'incidents': []})
+            digest['incidents'].append({
+                'violation_id': violation_id,
+                'license_plate': violation_data['license_plate'],
+                'speed': violation_data['speed'],
+                'timestamp': violation_data['timestamp'],
+                'fine_amount': violation_data.get('fine_amount', 0),
+                'image_path': image_path
+            })
+
+    def flush(self, force=False):
+        """Queue the digests whose window has closed (all of them with force)."""
+        now = time.monotonic()
+        with self._lock:
+            due = [recipient for recipient, digest in self._pending.items()
+                   if force or now - digest['opened'] >= self.window]
+            digests = [(recipient, self._pending.pop(recipient)) for recipient in due]
+
+        for recipient, digest in digests:
+            try:
+                self._send(recipient, digest['incidents'])
+            except Exception as e:
+                print(f"Error sending violation digest to {recipient}: {str(e)}")
+        return len(digests)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the scheduler and send whatever is still pending."""
+        self._stop.set()
+        self.flush(force=True)
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            self.flush()
+
+    def _send(self, recipient, incidents):
+        incidents.sort(key=lambda incident: incident['timestamp'])
+        plates = sorted({incident['license_plate'] for incident in incidents})
+        if len(incidents) == 1:
+            subject = f"Traffic Violation Notice - {plates[0]}"
+        else:
+            subject = f"Traffic Violation Notice - {len(incidents)} violations ({', '.join(plates)})"
+
+        lines = []
+        attachments = []
+        for number, incident in enumerate(incidents, 1):
+            lines.append(f"        {number}. {incident['timestamp'].strftime('%Y-%m-%d %H:%M:%S')} - "
+                         f"{incident['license_plate']} at {incident['speed']:.1f} km/h "
+                         f"(fine ${incident['fine_amount']:.2f})")
+            if len(attachments) < self.max_thumbnails:
+                thumbnail = self._thumbnail(incident['image_path'])
+                if thumbnail is not None:
+                    attachments.append((f"violation_{number}.jpg", thumbnail))
+
+        body = f"""
+        Dear Vehicle Owner,
+
+        The following traffic violations were recorded for your vehicle(s):
+
+{chr(10).join(lines)}
+
+        Total fines: ${sum(incident['fine_amount'] for incident in incidents):.2f}
+
+        Please pay the fines within 30 days.
+
+        Regards,
+        Traffic Monitoring System
+        """
+
+        violation_ids = [incident['violation_id'] for incident in incidents
+                         if incident['violation_id'] is not None]
+        self.email_queue.send(
+            recipient, subject, body, attachments,
+            violation_id=violation_ids[0] if violation_ids else None,
+            details={'violation_ids': violation_ids, 'digest': True}
+        )
+        self.digests_sent += 1
+        print(f"📧 Violation digest of {len(incidents)} incident(s) queued for: {recipient}")
+
+    def _thumbnail(self, image_path):
+        # Small JPEG of the evidence image, or None if it cannot be read
+        if not image_path or not os.path.exists(image_path):
+            return None
+        image = cv2.imread(image_path)
+        if image is None:
+            return None
+        height, width = image.shape[:2]
+        if width > self.thumbnail_width:
+            size = (self.thumbnail_width, max(1, height * self.thumbnail_width // width))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        return encoded.tobytes() if ok else None
+
+
+def get_violation_digest():
+    """Return the shared, running digest, or None when digest mode is off."""
+    global _digest
+    if DIGEST_WINDOW <= 0:
+        return None
+    with _digest_lock:
+        if _digest is None:
+            _digest = ViolationDigest().start()
+            # Pending digests still go out when the process exits
+            atexit.register(_close_digest)
+        return _digest
+
+
+def _close_digest():
+    _digest.close()
+    _digest.email_queue.flush(timeout=30)
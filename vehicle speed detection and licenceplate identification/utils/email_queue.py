@@ -0,0 +1,231 @@
+import mimetypes
+import os
+import queue
+import smtplib
+import threading
+import time
+from datetime import datetime
+from email.message import EmailMessage
+
+from config.email_config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SENDER_EMAIL
+from utils.mongo_pool import get_database
+
+_email_queue = None
+_email_queue_lock = threading.Lock()
+
+
+class EmailQueue:
+    """Outbound email queue drained by one worker thread.
+
+    The worker keeps a single authenticated SMTP session open and sends
+    every message waiting in the queue over it (up to batch_size at a time),
+    closing the session after idle_timeout seconds without mail. A message
+    that fails is retried with exponential backoff, up to max_retries
+    attempts. The outcome of every message with a violation_id is recorded
+    in the email_notifications collection.
+
+    For local testing, point it at a debugging server with use_tls=False
+    and no username, e.g. `python -m aiosmtpd -n -l localhost:1025`.
+    """
+
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, username=SMTP_USERNAME,
+                 password=SMTP_PASSWORD, sender=SENDER_EMAIL, use_tls=True,
+                 batch_size=20, max_retries=4, retry_delay=2.0, idle_timeout=60,
+                 notifications=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.use_tls = use_tls
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay  # Doubled after every failed attempt
+        self.idle_timeout = idle_timeout
+        self.sent = 0
+        self.failed = 0
+        self._notifications = notifications
+        self._queue = queue.Queue()
+        self._retries = []  # Messages waiting for their next attempt
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._smtp = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def notifications(self):
+        if self._notifications is None:
+            self._notifications = get_database('monitoring')['email_notifications']
+        return self._notifications
+
+    def send(self, recipient, subject, body, attachments=(), violation_id=None, details=None):
+        """Queue a message.
+
+        Attachments are file paths or (filename, bytes) pairs. `details` are
+        extra fields for the email_notifications record.
+        """
+        with self._idle:
+            self._pending += 1
+        self._queue.put({
+            'recipient': recipient,
+            'subject': subject,
+            'body': body,
+            'attachments': list(attachments),
+            'violation_id': violation_id,
+            'details': details or {},
+            'attempts': 0,
+            'next_try': 0.0
+        })
+
+    def send_violation_notification(self, violation_data, violation_id=None, image_path=None):
+        """Queue the violation notice for a vehicle owner."""
+        subject = f"Traffic Violation Notice - {violation_data['license_plate']}"
+        body = f"""
+        Dear Vehicle Owner,
+
+        A traffic violation was recorded for your vehicle:
+
+        License Plate: {violation_data['license_plate']}
+        Date: {violation_data['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}
+        Speed: {violation_data['speed']:.1f} km/h
+        Fine Amount: ${violation_data.get('fine_amount', 0):.2f}
+
+        Please pay the fine within 30 days.
+
+        Regards,
+        Traffic Monitoring System
+        """
+        attachments = [image_path] if image_path and os.path.exists(image_path) else []
+        self.send(violation_data['owner_email'], subject, body, attachments, violation_id)
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been sent or has failed for good."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if not self._retries:
+                    # Nothing to send for a while: let the session go
+                    self._disconnect()
+                continue
+
+            for message in batch:
+                self._deliver(message)
+
+    def _next_batch(self):
+        # Wait for new mail, or until the first retry is due
+        now = time.monotonic()
+        due = [message for message in self._retries if message['next_try'] <= now]
+        self._retries = [message for message in self._retries if message['next_try'] > now]
+        if not due:
+            waits = [message['next_try'] - now for message in self._retries]
+            timeout = min(waits + [self.idle_timeout])
+            try:
+                due.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                return []
+
+        while len(due) < self.batch_size:
+            try:
+                due.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return due
+
+    def _connect(self):
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    def _disconnect(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _deliver(self, message):
+        message['attempts'] += 1
+        try:
+            try:
+                self._connect().send_message(self._build(message))
+            except smtplib.SMTPServerDisconnected:
+                # The reused session timed out on the server side; reconnect once
+                self._smtp = None
+                self._connect().send_message(self._build(message))
+        except Exception as e:
+            self._disconnect()
+            if message['attempts'] < self.max_retries:
+                delay = self.retry_delay * 2 ** (message['attempts'] - 1)
+                message['next_try'] = time.monotonic() + delay
+                self._retries.append(message)
+                print(f"Error sending email to {message['recipient']} (attempt {message['attempts']}), "
+                      f"retrying in {delay:.0f}s: {str(e)}")
+                return
+            self.failed += 1
+            print(f"Failed to send email to {message['recipient']}: {str(e)}")
+            self._finish(message, 'failed', str(e))
+            return
+
+        self.sent += 1
+        print(f"📧 Email sent to: {message['recipient']}")
+        self._finish(message, 'sent')
+
+    def _build(self, message):
+        email = EmailMessage()
+        email['From'] = self.sender
+        email['To'] = message['recipient']
+        email['Subject'] = message['subject']
+        email.set_content(message['body'])
+        for attachment in message['attachments']:
+            if isinstance(attachment, tuple):
+                filename, data = attachment
+            else:
+                filename = os.path.basename(attachment)
+                with open(attachment, 'rb') as f:
+                    data = f.read()
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            maintype, subtype = content_type.split('/', 1)
+            email.add_attachment(data, maintype=maintype, subtype=subtype, filename=filename)
+        return email
+
+    def _finish(self, message, status, error=None):
+        if message['violation_id'] is not None:
+            record = {
+                'violation_id': message['violation_id'],
+                'email': message['recipient'],
+                'status': status,
+                'attempts': message['attempts'],
+                'error': error,
+                'sent_date': datetime.utcnow()
+            }
+            record.update(message['details'])
+            try:
+                self.notifications.insert_one(record)
+            except Exception as e:
+                print(f"Error recording email notification: {str(e)}")
+
+        with self._idle:
+            self._pending -= 1
+            self._idle.notify_all()
+
+
+def get_email_queue():
+    """Return the shared email queue, creating it on first use."""
+    global _email_queue
+    with _email_queue_lock:
+        if _email_queue is None:
+            _email_queue = EmailQueue()
+        return _email_queue
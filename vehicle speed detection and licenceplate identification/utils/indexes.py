@@ -0,0 +1,149 @@
+import threading
+import time
+
+from pymongo import ASCENDING, DESCENDING, monitoring
+from pymongo.errors import ConnectionFailure
+
+# Every index the application's queries rely on: collection -> [(keys, options)]
+INDEXES = {
+    'violations': [
+        # Keyset pagination of /violations and the date-range reports
+        ([('timestamp', DESCENDING), ('_id', DESCENDING)], {}),
+        ([('license_plate', ASCENDING), ('timestamp', DESCENDING)], {})
+    ],
+    'users': [
+        ([('email', ASCENDING)], {}),
+        ([('license_plate', ASCENDING)], {'sparse': True})
+    ],
+    'videos': [
+        ([('filepath', ASCENDING)], {}),
+        # Latest upload of a user, and the active jobs
+        ([('uploaded_by', ASCENDING), ('uploaded_at', DESCENDING)], {}),
+        ([('status', ASCENDING), ('uploaded_at', ASCENDING)], {})
+    ],
+    'email_notifications': [
+        ([('sent_date', DESCENDING)], {}),
+        ([('violation_id', ASCENDING)], {})
+    ],
+    'detections': [
+        ([('plate_number', ASCENDING)], {}),
+        ([('violation', ASCENDING), ('timestamp', ASCENDING)], {})
+    ]
+}
+
+_listener = None
+
+
+def _index_name(keys):
+    return '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+
+def ensure_indexes(db, collections=None):
+    """Create the declared indexes of a database and verify they exist.
+
+    Creating an index that already exists is a no-op, so this is safe to run
+    on every startup; errors, including an unreachable server, are logged
+    rather than raised. Returns {collection: [missing index names]} for the
+    indexes that could not be verified.
+    """
+    missing = {}
+    for name, indexes in INDEXES.items():
+        if collections is not None and name not in collections:
+            continue
+        collection = db[name]
+        for keys, options in indexes:
+            try:
+                collection.create_index(keys, **options)
+            except ConnectionFailure as e:
+                # MongoDB is unreachable: report and let the app start anyway
+                print(f"Error creating MongoDB indexes on {db.name}: {str(e)}")
+                return {name: [_index_name(keys) for keys, _ in indexes]
+                        for name, indexes in INDEXES.items()
+                        if collections is None or name in collections}
+            except Exception as e:
+                print(f"Error creating index {keys} on {name}: {str(e)}")
+
+        try:
+            existing = {tuple(info['key']) for info in collection.index_information().values()}
+        except Exception as e:
+            print(f"Error reading indexes of {name}: {str(e)}")
+            existing = set()
+        absent = [_index_name(keys)
+                  for keys, _ in indexes
+                  if tuple((field, direction) for field, direction in keys) not in existing]
+        if absent:
+            missing[name] = absent
+
+    if missing:
+        print(f"Missing MongoDB indexes: {missing}")
+    else:
+        print(f"MongoDB indexes verified on {db.name}")
+    return missing
+
+
+def is_indexed(collection, fields):
+    """Whether a declared index starts with one of the queried fields."""
+    for keys, _ in INDEXES.get(collection, []):
+        if keys[0][0] in fields:
+            return True
+    return '_id' in fields
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Report MongoDB queries slower than threshold_ms.
+
+    Queries whose filter starts with no declared index are flagged as
+    unindexed: those are the collection scans to add an index for.
+    """
+
+    QUERY_COMMANDS = ('find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify')
+
+    def __init__(self, threshold_ms=100):
+        self.threshold_ms = threshold_ms
+        self.slow_queries = 0
+        self._started = {}  # request id -> (collection, filter fields)
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name not in self.QUERY_COMMANDS:
+            return
+        command = event.command
+        query = command.get('filter') or command.get('query') or {}
+        if event.command_name == 'aggregate':
+            stages = command.get('pipeline') or [{}]
+            query = stages[0].get('$match', {})
+        elif event.command_name in ('update', 'delete'):
+            statements = command.get('updates') or command.get('deletes') or [{}]
+            query = statements[0].get('q', {})
+        with self._lock:
+            self._started[event.request_id] = (command.get(event.command_name), list(query))
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        with self._lock:
+            started = self._started.pop(event.request_id, None)
+        if started is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        collection, fields = started
+        self.slow_queries += 1
+        label = 'unindexed ' if fields and not is_indexed(collection, fields) else ''
+        print(f"[{time.strftime('%H:%M:%S')}] Slow {label}MongoDB {event.command_name} on "
+              f"{event.database_name}.{collection} ({duration_ms:.0f} ms), filter fields: {fields}")
+
+
+def install_slow_query_listener(threshold_ms=100):
+    """Register the slow query listener for every MongoClient created afterwards."""
+    global _listener
+    if _listener is None:
+        _listener = SlowQueryListener(threshold_ms)
+        monitoring.register(_listener)
+    return _listener
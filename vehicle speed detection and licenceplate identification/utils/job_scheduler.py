@@ -0,0 +1,173 @@
+import itertools
+import queue
+import threading
+from datetime import datetime
+
+from utils.progress import ProgressReporter
+
+# Job states, as stored in the `status` field of a video document
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class JobScheduler:
+    """Bounded priority queue of video processing jobs run by a fixed pool of threads.
+
+    A job is a callable taking its status dict, which it keeps updated with a
+    'progress' percentage, and returning whether it succeeded. Jobs with a
+    higher priority run first, jobs of equal priority in submission order.
+    Cancelling a queued job drops it; cancelling a running job sets
+    status_dict['cancelled'], which the video processors check between frames.
+
+    Every state change is passed to on_update(job_id, fields) so it can be
+    persisted. So is the progress of a running job, through a
+    ProgressReporter found in status_dict['progress_reporter'] that
+    coalesces updates to one per progress_interval seconds and progress_step
+    points.
+    """
+
+    def __init__(self, workers=1, max_queued=10, on_update=None, progress_interval=2.0,
+                 progress_step=1.0):
+        self.workers = max(1, int(workers))
+        self.max_queued = max_queued
+        self.on_update = on_update
+        self.progress_interval = progress_interval
+        self.progress_step = progress_step
+        self.jobs = {}  # job id -> job dict, until the job has finished
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        if not self._threads:
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, job_id, target, priority=0):
+        """Queue a job; raises queue.Full when max_queued jobs are already waiting."""
+        with self._lock:
+            if self.queued_count() >= self.max_queued:
+                raise queue.Full(f"Too many queued jobs (limit {self.max_queued})")
+            order = next(self._order)
+            job = {
+                'id': job_id,
+                'order': order,
+                'target': target,
+                'priority': priority,
+                'status': QUEUED,
+                'status_dict': {'progress': 0}
+            }
+            self.jobs[job_id] = job
+            self._queue.put((-priority, order, job_id))
+        self._update(job_id, {'status': QUEUED, 'progress': 0, 'priority': priority})
+        self.start()
+        return job
+
+    def resume(self, jobs):
+        """Queue again the (job_id, target, priority) jobs a restart interrupted.
+
+        Jobs that no longer fit in the queue are cancelled. Returns the
+        number of jobs queued.
+        """
+        resumed = 0
+        for job_id, target, priority in jobs:
+            try:
+                self.submit(job_id, target, priority)
+                resumed += 1
+            except queue.Full:
+                self._update(job_id, {'status': CANCELLED, 'error_message': 'Job queue full after restart'})
+        return resumed
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns False for unknown or finished jobs."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            if job['status'] == QUEUED:
+                # Left in the priority queue; the worker drops it when it comes up
+                job['status'] = CANCELLED
+                del self.jobs[job_id]
+                cancelled = True
+            else:
+                job['status_dict']['cancelled'] = True
+                cancelled = False
+        if cancelled:
+            self._update(job_id, {'status': CANCELLED})
+        return True
+
+    def queued_count(self):
+        return sum(1 for job in self.jobs.values() if job['status'] == QUEUED)
+
+    def queue_position(self, job_id):
+        """1-based position of a queued job in run order, or None."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job['status'] != QUEUED:
+                return None
+            key = (-job['priority'], job['order'])
+            return 1 + sum(1 for other in self.jobs.values()
+                           if other['status'] == QUEUED
+                           and (-other['priority'], other['order']) < key)
+
+    def get(self, job_id):
+        """Live status of an unfinished job: status, progress and queue position."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return {
+            'status': job['status'],
+            'progress': job['status_dict'].get('progress', 0),
+            'queue_position': self.queue_position(job_id)
+        }
+
+    def _work(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None or job['status'] != QUEUED:
+                    continue
+                job['status'] = RUNNING
+            self._update(job_id, {'status': RUNNING, 'started_at': datetime.utcnow()})
+
+            reporter = ProgressReporter(
+                lambda fields, job_id=job_id: self._update(job_id, fields),
+                min_interval=self.progress_interval,
+                min_step=self.progress_step
+            )
+            job['status_dict']['progress_reporter'] = reporter
+            fields = {}
+            try:
+                succeeded = job['target'](job['status_dict'])
+                if job['status_dict'].get('cancelled'):
+                    fields['status'] = CANCELLED
+                elif succeeded is False:
+                    fields.update({'status': FAILED, 'error_message': 'Video processing failed'})
+                else:
+                    fields.update({'status': DONE, 'progress': 100})
+            except Exception as e:
+                print(f"Error in video job {job_id}: {str(e)}")
+                fields.update({'status': FAILED, 'error_message': str(e)})
+            finally:
+                # Pending progress goes out before the final state
+                reporter.close()
+                fields['finished_at'] = datetime.utcnow()
+                with self._lock:
+                    self.jobs.pop(job_id, None)
+                self._update(job_id, fields)
+
+    def _update(self, job_id, fields):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(job_id, fields)
+        except Exception as e:
+            print(f"Error updating job {job_id}: {str(e)}")
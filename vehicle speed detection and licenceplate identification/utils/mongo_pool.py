@@ -0,0 +1,68 @@
+import os
+import threading
+
+from pymongo import MongoClient
+
+DEFAULT_URI = 'mongodb://localhost:27017/'
+
+# Pool settings shared by every client: enough sockets for the Flask threads,
+# the processing workers and the background writers, and fast failures
+# instead of requests hanging when MongoDB is down
+POOL_OPTIONS = {
+    'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL_SIZE', 50)),
+    'minPoolSize': int(os.environ.get('MONGO_MIN_POOL_SIZE', 2)),
+    'maxIdleTimeMS': 60000,
+    'waitQueueTimeoutMS': 5000,
+    'connectTimeoutMS': 5000,
+    'serverSelectionTimeoutMS': 5000,
+    'retryWrites': True
+}
+
+_clients = {}  # (pid, uri) -> MongoClient
+_violation_log = None
+_lock = threading.Lock()
+
+
+def get_client(uri=None):
+    """Return the process-wide MongoClient for a URI, creating it on first use.
+
+    MongoClient is thread-safe and pools its connections, so one client per
+    server is all a process needs. Clients are keyed by process id as well:
+    a client must not be used across a fork (Celery workers, process pools).
+    """
+    key = (os.getpid(), uri or DEFAULT_URI)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = MongoClient(key[1], **POOL_OPTIONS)
+            _clients[key] = client
+        return client
+
+
+def get_database(name, uri=None):
+    """Return a database on the shared client."""
+    return get_client(uri)[name]
+
+
+def get_violation_log():
+    """Return the shared ViolationLog, creating it on first use.
+
+    ViolationLog opens its own connection, so it is created once per process
+    instead of once per request.
+    """
+    global _violation_log
+    from models.violation_log import ViolationLog
+
+    with _lock:
+        if _violation_log is None:
+            _violation_log = ViolationLog()
+        return _violation_log
+
+
+def close_clients():
+    """Close every client of this process."""
+    with _lock:
+        for (pid, _), client in list(_clients.items()):
+            if pid == os.getpid():
+                client.close()
+        _clients.clear()
@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+HASH_BITS = 64
+
+
+def plate_hash(plate_img):
+    """64-bit difference hash of a (thresholded) plate crop.
+
+    Crops of the same plate taken a few frames apart hash to the same or a
+    very close value, while different plates end up far apart.
+    """
+    if plate_img.ndim == 3:
+        plate_img = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(plate_img, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def hash_bands(crop_hash, count):
+    """Split a hash into `count` bit bands, as (band index, value) pairs.
+
+    Two hashes that differ in fewer than `count` bits agree on at least one
+    whole band, so looking up each band finds every near match.
+    """
+    width = HASH_BITS // count
+    bands = []
+    for i in range(count):
+        bits = width if i < count - 1 else HASH_BITS - width * i
+        bands.append((i, (crop_hash >> (width * i)) & ((1 << bits) - 1)))
+    return bands
+
+
+class PlateOCRCache:
+    """LRU memo of OCR readings keyed by tracker ID and plate-crop hash.
+
+    Readings are only cached for a known track: the hashes of different
+    plates collide too often for a crop hash alone to identify a plate, so
+    get() misses and put() stores nothing when track_id is None.
+
+    Every reading stored for a track also casts a confidence-weighted vote;
+    readings served from the cache do not, so only real OCR calls count.
+    Once one text has `stable_votes` votes and at least `min_share` of the
+    track's total confidence, the track is stable and callers can skip OCR
+    for it altogether.
+
+    Near-duplicate crops are found through the bands of their hashes
+    (max_distance + 1 of them): a lookup only compares against the entries
+    of the same track sharing a band, not the whole cache.
+    """
+
+    def __init__(self, max_entries=4096, max_tracks=1024, stable_votes=3,
+                 min_share=0.6, max_distance=4):
+        self.max_entries = max_entries
+        self.max_tracks = max_tracks
+        self.stable_votes = stable_votes
+        self.min_share = min_share
+        self.max_distance = max_distance  # Hash bits two crops may differ by
+        self.band_count = min(max_distance + 1, HASH_BITS)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (track_id, hash) -> (text, confidence)
+        self._bands = {}  # (track_id, band) -> keys of the entries with that band
+        self._votes = OrderedDict()  # track_id -> {text: [votes, confidence_sum]}
+        self._lock = threading.Lock()
+
+    def key(self, track_id, plate_img):
+        return (track_id, plate_hash(plate_img))
+
+    def get(self, key):
+        """Return the cached (text, confidence) for a key, or None."""
+        track_id, crop_hash = key
+        with self._lock:
+            entry = self._entries.get(key) if track_id is not None else None
+            if entry is None and track_id is not None:
+                # The closest crop of a plate this track already read
+                nearest = None
+                for band in hash_bands(crop_hash, self.band_count):
+                    for candidate in self._bands.get((track_id, band), ()):
+                        distance = hamming(candidate[1], crop_hash)
+                        if distance <= self.max_distance and (nearest is None or distance < nearest[0]):
+                            nearest = (distance, candidate)
+                if nearest is not None:
+                    entry = self._entries[nearest[1]]
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._store(key, entry)
+            self.hits += 1
+            return entry
+
+    def put(self, key, text, confidence, vote=True):
+        """Cache an OCR reading and, if `vote` is set, count it for the track."""
+        track_id = key[0]
+        if track_id is None:
+            return
+        with self._lock:
+            self._store(key, (text, confidence))
+            if vote and text:
+                votes = self._votes.setdefault(track_id, {})
+                tally = votes.setdefault(text, [0, 0.0])
+                tally[0] += 1
+                tally[1] += confidence
+                self._votes.move_to_end(track_id)
+                self._evict(self._votes, self.max_tracks)
+
+    def stable_reading(self, track_id):
+        """Return the (text, confidence) a track has settled on, or None."""
+        with self._lock:
+            votes = self._votes.get(track_id)
+            if not votes:
+                return None
+            text, (count, confidence_sum) = max(votes.items(), key=lambda item: item[1][1])
+            total = sum(tally[1] for tally in votes.values())
+            if count >= self.stable_votes and total > 0 and confidence_sum / total >= self.min_share:
+                return text, confidence_sum / count
+            return None
+
+    def forget(self, track_id):
+        """Drop the votes of a track that has left the scene."""
+        with self._lock:
+            self._votes.pop(track_id, None)
+
+    def _store(self, key, entry):
+        track_id, crop_hash = key
+        if key not in self._entries:
+            for band in hash_bands(crop_hash, self.band_count):
+                self._bands.setdefault((track_id, band), set()).add(key)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            (track_id, crop_hash), _ = self._entries.popitem(last=False)
+            for band in hash_bands(crop_hash, self.band_count):
+                keys = self._bands[(track_id, band)]
+                keys.discard((track_id, crop_hash))
+                if not keys:
+                    del self._bands[(track_id, band)]
+
+    def _evict(self, store, limit):
+        while len(store) > limit:
+            store.popitem(last=False)
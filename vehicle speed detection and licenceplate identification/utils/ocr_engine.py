@@ -0,0 +1,102 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_POOL_SIZE = int(os.environ.get('OCR_POOL_SIZE', 2))
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+class OCREngine:
+    """Process-wide pool of EasyOCR readers.
+
+    Loading a reader pulls the detection and recognition weights from disk,
+    so readers are created once and then lent out to one thread at a time.
+    """
+
+    def __init__(self, languages=('en',), pool_size=DEFAULT_POOL_SIZE, gpu=False):
+        self.languages = list(languages)
+        self.pool_size = max(1, int(pool_size))
+        self.gpu = gpu
+        self.loaded = False
+        self.load_time = 0.0
+        self.calls = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._readers = queue.Queue()
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def load(self):
+        """Create the readers of the pool (only the first call does any work)."""
+        with self._load_lock:
+            if self.loaded:
+                return
+
+            import easyocr
+
+            start = time.perf_counter()
+            for _ in range(self.pool_size):
+                self._readers.put(easyocr.Reader(self.languages, gpu=self.gpu))
+            self.load_time = time.perf_counter() - start
+            self.loaded = True
+            print(f"OCR engine loaded {self.pool_size} reader(s) in {self.load_time:.2f}s")
+
+    def warm_up(self):
+        """Load the pool and run every reader once so the first plate is fast."""
+        try:
+            self.load()
+            blank = np.full((32, 128), 255, dtype=np.uint8)
+            readers = [self._readers.get() for _ in range(self.pool_size)]
+            try:
+                for reader in readers:
+                    reader.readtext(blank, detail=0)
+            finally:
+                for reader in readers:
+                    self._readers.put(reader)
+        except Exception as e:
+            print(f"Error warming up OCR engine: {str(e)}")
+
+    def readtext(self, image, **kwargs):
+        """Run EasyOCR's readtext on a pooled reader (blocks while all are busy)."""
+        if not self.loaded:
+            self.load()
+
+        reader = self._readers.get()
+        start = time.perf_counter()
+        try:
+            return reader.readtext(image, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._readers.put(reader)
+            with self._stats_lock:
+                self.calls += 1
+                self.total_latency += elapsed
+                self.max_latency = max(self.max_latency, elapsed)
+
+    def stats(self):
+        """Load time and per-call latency metrics, in seconds."""
+        with self._stats_lock:
+            calls = self.calls
+            total = self.total_latency
+            max_latency = self.max_latency
+        return {
+            'pool_size': self.pool_size,
+            'load_time': round(self.load_time, 3),
+            'calls': calls,
+            'avg_latency': round(total / calls, 4) if calls else 0.0,
+            'max_latency': round(max_latency, 4)
+        }
+
+
+def get_ocr_engine(pool_size=None):
+    """Return the shared OCR engine, creating it on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = OCREngine(pool_size=pool_size or DEFAULT_POOL_SIZE)
+        return _engine
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+
+def encode_cursor(document):
+    """Page cursor pointing at a document: its timestamp and id."""
+    return f"{document['timestamp'].strftime('%Y%m%d%H%M%S%f')}_{document['_id']}"
+
+
+def decode_cursor(cursor):
+    timestamp, document_id = cursor.split('_')
+    return datetime.strptime(timestamp, '%Y%m%d%H%M%S%f'), ObjectId(document_id)
+
+
+def keyset_page(collection, query, fields, per_page, before=None, after=None, keep=None):
+    """One page of a collection in (timestamp, _id) order, newest first.
+
+    `before` pages towards older documents and `after` back towards newer
+    ones, both given as cursors. Documents for which keep(document) is
+    false are skipped. Returns the rows, newest first, and the pagination
+    info: the cursors of the older and newer pages (None when there are
+    none) and whether this is the first page.
+    """
+    query = dict(query)
+    if before or after:
+        timestamp, document_id = decode_cursor(before or after)
+        op = '$lt' if before else '$gt'
+        query['$or'] = [
+            {'timestamp': {op: timestamp}},
+            {'timestamp': timestamp, '_id': {op: document_id}}
+        ]
+    direction = 1 if after else -1
+
+    rows = []
+    cursor = collection.find(query, fields).sort(
+        [('timestamp', direction), ('_id', direction)]
+    ).batch_size(per_page + 1)
+    more = False
+    for document in cursor:
+        if len(rows) == per_page:
+            more = True
+            break
+        if keep is None or keep(document):
+            rows.append(document)
+    cursor.close()
+    if after:
+        rows.reverse()
+
+    # Older pages exist if this page is full going back, or if we came forward
+    has_older = more if not after else True
+    has_newer = bool(before) or bool(after and more)
+    return rows, {
+        'per_page': per_page,
+        'older': encode_cursor(rows[-1]) if rows and has_older else None,
+        'newer': encode_cursor(rows[0]) if rows and has_newer else None,
+        'first_page': not has_newer
+    }
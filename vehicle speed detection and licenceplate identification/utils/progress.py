@@ -0,0 +1,84 @@
+import threading
+import time
+
+
+class ProgressReporter:
+    """Coalesce progress updates and write them on a background thread.
+
+    An update is only written once progress has moved by at least min_step
+    points and min_interval seconds have passed since the previous write;
+    reaching 100% is always written. report() never waits for the database:
+    the writer thread only ever holds the latest update, so a slow write
+    drops intermediate values instead of queueing them.
+
+    `write` is called with a dict of fields, e.g. {'progress': 42.0}.
+    """
+
+    def __init__(self, write, min_interval=2.0, min_step=1.0):
+        self.write = write
+        self.min_interval = min_interval
+        self.min_step = min_step
+        self.reports = 0
+        self.writes = 0
+        self._pending = None  # Update waiting for the writer thread
+        self._latest = None  # Most recent update reported, written or not
+        self._last_progress = None
+        self._last_time = 0.0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def report(self, progress, **fields):
+        """Record the current progress; returns True if it will be written."""
+        fields['progress'] = progress
+        now = time.monotonic()
+        with self._condition:
+            self.reports += 1
+            self._latest = fields
+            if self._last_progress is not None and progress < 100:
+                if progress - self._last_progress < self.min_step or now - self._last_time < self.min_interval:
+                    return False
+            self._queue(fields, now)
+            return True
+
+    def close(self):
+        """Write the latest reported progress if it was held back, then stop the thread."""
+        with self._condition:
+            if self._latest is not None and self._latest['progress'] != self._last_progress:
+                self._queue(self._latest, time.monotonic())
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=10)
+
+    def _queue(self, fields, now):
+        self._last_progress = fields['progress']
+        self._last_time = now
+        self._pending = fields
+        self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                fields, self._pending = self._pending, None
+                closed = self._closed
+
+            if fields is not None:
+                try:
+                    self.write(fields)
+                    self.writes += 1
+                except Exception as e:
+                    print(f"Error writing progress: {str(e)}")
+            if closed and fields is None:
+                return
+
+
+def update_progress(status_dict, progress, **fields):
+    """Set the progress of a processing job and pass it on to its reporter, if any."""
+    status_dict['progress'] = progress
+    status_dict.update(fields)
+    reporter = status_dict.get('progress_reporter')
+    if reporter is not None:
+        reporter.report(progress, **fields)
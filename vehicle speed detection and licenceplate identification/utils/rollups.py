@@ -0,0 +1,230 @@
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+
+from utils.mongo_pool import get_database
+
+# The app database (MONGO_URI): its violations collection is the one the
+# /violations page lists and deletes from, and the one rolled up
+ROLLUP_DATABASE = 'monitoring'
+ROLLUP_COLLECTION = 'violation_rollups'
+ROLLUP_FIELDS = {'timestamp': 1, 'speed': 1, 'license_plate': 1}
+REFRESH_INTERVAL = 60  # Seconds the rollup of an open day may lag its violations
+CLOSE_DELAY = timedelta(minutes=10)  # Late writes a finished day still waits for
+
+
+def get_rollups():
+    """The collection holding one rollup document per day."""
+    return get_database(ROLLUP_DATABASE)[ROLLUP_COLLECTION]
+
+
+def get_violations():
+    """The violations collection the rollups summarise."""
+    return get_database(ROLLUP_DATABASE)['violations']
+
+
+def day_key(timestamp):
+    return timestamp.strftime('%Y-%m-%d')
+
+
+def plate_key(license_plate):
+    # Field names may not contain '.' or start with '$'
+    return str(license_plate).replace('.', '_').replace('$', '_') or 'unknown'
+
+
+def rollup_updates(violations, sign=1):
+    """Bulk updates adding (sign=1) or removing (sign=-1) violations from the daily rollups.
+
+    A rollup document is keyed by its day ('YYYY-MM-DD') and holds:
+    count, speed_sum and max_speed for the day, the same per hour under
+    hours.HH, and the number of violations per plate under plates.
+    Removing a violation cannot lower max_speed, which stays an upper bound.
+    """
+    days = {}
+    for violation in violations:
+        timestamp = violation.get('timestamp')
+        if timestamp is None:
+            continue
+        speed = float(violation.get('speed') or 0)
+        hour = timestamp.strftime('%H')
+        day = days.setdefault(day_key(timestamp), {'inc': {}, 'max': {}})
+        for field, value in (('count', sign), ('speed_sum', sign * speed),
+                             (f'hours.{hour}.count', sign), (f'hours.{hour}.speed_sum', sign * speed),
+                             (f"plates.{plate_key(violation.get('license_plate'))}", sign)):
+            day['inc'][field] = day['inc'].get(field, 0) + value
+        if sign > 0:
+            for field in ('max_speed', f'hours.{hour}.max_speed'):
+                day['max'][field] = max(day['max'].get(field, speed), speed)
+
+    updates = []
+    for key, day in days.items():
+        update = {
+            '$inc': day['inc'],
+            '$setOnInsert': {'date': datetime.strptime(key, '%Y-%m-%d')}
+        }
+        if day['max']:
+            update['$max'] = day['max']
+        updates.append(UpdateOne({'_id': key}, update, upsert=True))
+    return updates
+
+
+def apply_rollups(violations, sign=1, collection=None):
+    """Add violations to (or remove them from) the daily rollups."""
+    updates = rollup_updates(violations, sign)
+    if updates:
+        (collection if collection is not None else get_rollups()).bulk_write(updates, ordered=False)
+
+
+def set_image_exists(violation_id, image_exists, violations=None):
+    """Store on a violation whether its evidence image was saved."""
+    violations = violations if violations is not None else get_violations()
+    if not isinstance(violation_id, ObjectId) and ObjectId.is_valid(str(violation_id)):
+        violation_id = ObjectId(str(violation_id))
+    violations.update_one({'_id': violation_id}, {'$set': {'image_exists': bool(image_exists)}})
+
+
+def day_rollup(key, violations):
+    """The rollup document of one day, computed from all of its violations."""
+    rollup = {'_id': key, 'date': datetime.strptime(key, '%Y-%m-%d'),
+              'count': 0, 'speed_sum': 0.0, 'hours': {}, 'plates': {}}
+    for violation in violations:
+        timestamp = violation.get('timestamp')
+        if timestamp is None:
+            continue
+        speed = float(violation.get('speed') or 0)
+        hour = rollup['hours'].setdefault(timestamp.strftime('%H'), {'count': 0, 'speed_sum': 0.0})
+        for stats in (rollup, hour):
+            stats['count'] += 1
+            stats['speed_sum'] += speed
+            stats['max_speed'] = max(stats.get('max_speed', speed), speed)
+        plate = plate_key(violation.get('license_plate'))
+        rollup['plates'][plate] = rollup['plates'].get(plate, 0) + 1
+    return rollup
+
+
+def refresh_rollups(start_dt=None, end_dt=None, violations=None, collection=None, now=None):
+    """Rebuild the rollups of the open days in [start_dt, end_dt) from the violations.
+
+    A day stays open until it has been rebuilt CLOSE_DELAY after it ended,
+    so every violation stored that day is counted whichever code path
+    wrote it; an open day is rebuilt at most every REFRESH_INTERVAL
+    seconds. Days without a rollup document (never rolled up, or cleared)
+    are open too. By default the days that can still be open, yesterday
+    and today, are refreshed.
+    """
+    violations = violations if violations is not None else get_violations()
+    collection = collection if collection is not None else get_rollups()
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    day = (start_dt or today - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    end = min(end_dt or today + timedelta(days=1), now)
+
+    refreshed = {rollup['_id']: rollup.get('refreshed_at') for rollup in collection.find(
+        {'_id': {'$gte': day_key(day), '$lte': day_key(end)}}, {'refreshed_at': 1})}
+    while day < end:
+        key = day_key(day)
+        next_day = day + timedelta(days=1)
+        last = refreshed.get(key)
+        closed = last is not None and last >= next_day + CLOSE_DELAY
+        fresh = last is not None and (now - last).total_seconds() < REFRESH_INTERVAL
+        if not closed and not fresh:
+            rollup = day_rollup(key, violations.find(
+                {'timestamp': {'$gte': day, '$lt': next_day}}, ROLLUP_FIELDS))
+            rollup['refreshed_at'] = now
+            collection.replace_one({'_id': key}, rollup, upsert=True)
+        day = next_day
+
+
+def rollup_days(start_dt, end_dt, collection=None, violations=None):
+    """Rollup documents of the days in [start_dt, end_dt), oldest first."""
+    collection = collection if collection is not None else get_rollups()
+    refresh_rollups(start_dt, end_dt, violations, collection)
+    return list(collection.find(
+        {'_id': {'$gte': day_key(start_dt), '$lt': day_key(end_dt)}}
+    ).sort('_id', 1))
+
+
+def count_violations(start_dt=None, end_dt=None, collection=None, violations=None):
+    """Number of violations in whole days from start_dt up to end_dt (all by default)."""
+    collection = collection if collection is not None else get_rollups()
+    refresh_rollups(start_dt, end_dt, violations, collection)
+    query = {}
+    if start_dt is not None:
+        query.setdefault('_id', {})['$gte'] = day_key(start_dt)
+    if end_dt is not None:
+        query.setdefault('_id', {})['$lt'] = day_key(end_dt)
+    result = list(collection.aggregate([
+        {'$match': query},
+        {'$group': {'_id': None, 'count': {'$sum': '$count'}}}
+    ]))
+    return result[0]['count'] if result else 0
+
+
+def _accumulate(cursor, collection, batch_size):
+    # Apply the violations of a cursor to the rollups, batch_size at a time
+    batch = []
+    total = 0
+    for violation in cursor.batch_size(batch_size):
+        batch.append(violation)
+        if len(batch) >= batch_size:
+            apply_rollups(batch, collection=collection)
+            total += len(batch)
+            batch = []
+    if batch:
+        apply_rollups(batch, collection=collection)
+        total += len(batch)
+    return total
+
+
+def backfill_rollups(violations=None, batch_size=1000, max_catch_up=5, collection=None):
+    """Rebuild every rollup document from the stored violations.
+
+    The rollups are built in a separate collection while the live one keeps
+    serving, then swapped in with a rename. The violations stored while the
+    rebuild ran are caught up by timestamp before the swap; the days still
+    open afterwards are rebuilt again by refresh_rollups. Violations deleted
+    during the rebuild are not reflected. Returns the number of violations
+    rolled up.
+    """
+    violations = violations if violations is not None else get_violations()
+    live = collection if collection is not None else get_rollups()
+    rebuild = live.database[live.name + '_rebuild']
+    rebuild.drop()
+
+    cutoff = datetime.now()
+    total = _accumulate(violations.find({'timestamp': {'$lt': cutoff}}, ROLLUP_FIELDS),
+                        rebuild, batch_size)
+    for _ in range(max_catch_up):
+        now = datetime.now()
+        caught_up = _accumulate(
+            violations.find({'timestamp': {'$gte': cutoff, '$lt': now}}, ROLLUP_FIELDS),
+            rebuild, batch_size)
+        total += caught_up
+        cutoff = now
+        if caught_up == 0:
+            break
+
+    if rebuild.estimated_document_count() == 0:
+        # Nothing to swap in: no violations at all
+        live.delete_many({})
+    else:
+        # Days that ended well before the last catch-up are final
+        rebuild.update_many({}, {'$set': {'refreshed_at': cutoff}})
+        rebuild.rename(live.name, dropTarget=True)
+    return total
+
+
+def today_start():
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def traffic_counts(collection=None, violations=None):
+    """Total, today's and last week's violation counts, as on the reports page."""
+    today = today_start()
+    return {
+        'total_violations': count_violations(collection=collection, violations=violations),
+        'daily_violations': count_violations(today, collection=collection, violations=violations),
+        'weekly_violations': count_violations(today - timedelta(days=7), collection=collection,
+                                              violations=violations)
+    }
@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from utils.mongo_pool import get_client
+
+_sink = None
+_sink_lock = threading.Lock()
+
+# Error code of a duplicate _id: the document was stored by an earlier attempt
+DUPLICATE_KEY = 11000
+# Seconds flush() waits by default: enough for a batch to go through every retry
+FLUSH_TIMEOUT = 60.0
+
+
+class ViolationSink:
+    """Write violation documents to MongoDB from a background thread.
+
+    Documents are collected into batches of up to batch_size, or whatever
+    arrived within flush_interval seconds, and stored with a single unordered
+    insert_many on the shared client. Every document gets its ObjectId
+    when it is added, so a batch that failed halfway can simply be sent
+    again: the documents already stored come back as duplicate keys.
+
+    Other slow writes (legacy logs, notifications) can be handed over with
+    defer(); they run on the same thread, after the batch they were queued
+    with. The processing threads only block when max_pending items are
+    already waiting, i.e. when the database has been unreachable for a while.
+
+    `collection` may be any object with a pymongo-style insert_many, such as
+    a mongomock collection, which replaces the real connection.
+    """
+
+    def __init__(self, collection=None, uri='mongodb://localhost:27017/',
+                 database='traffic_monitoring', collection_name='violations',
+                 batch_size=100, flush_interval=1.0, max_retries=5, retry_delay=0.5,
+                 max_pending=10000):
+        self.uri = uri
+        self.database = database
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay  # Doubled after every failed attempt
+        self.inserted = 0
+        self.dropped = 0
+        self._collection = collection
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = get_client(self.uri)[self.database][self.collection_name]
+        return self._collection
+
+    def add(self, document):
+        """Queue a violation document; returns the _id it will be stored with."""
+        document.setdefault('_id', ObjectId())
+        self._enqueue(('insert', document))
+        return document['_id']
+
+    def defer(self, write, *args):
+        """Run write(*args) on the sink thread, after the documents queued before it."""
+        self._enqueue(('call', (write, args)))
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Wait until everything queued so far has been written.
+
+        Returns False if items were still pending after timeout seconds
+        (None waits for as long as it takes).
+        """
+        with self._idle:
+            flushed = self._idle.wait_for(lambda: self._pending == 0, timeout)
+        if not flushed:
+            print(f"Violation sink still had {self._pending} pending writes after {timeout}s")
+        return flushed
+
+    def _enqueue(self, item):
+        with self._idle:
+            self._pending += 1
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            documents = [value for kind, value in items if kind == 'insert']
+            if documents:
+                self._insert(documents)
+            for kind, value in items:
+                if kind == 'call':
+                    write, args = value
+                    try:
+                        write(*args)
+                    except Exception as e:
+                        print(f"Error in deferred violation write: {str(e)}")
+
+            with self._idle:
+                self._pending -= len(items)
+                self._idle.notify_all()
+
+    def _insert(self, documents):
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.collection.insert_many(documents, ordered=False)
+                self.inserted += len(documents)
+                return True
+            except BulkWriteError as e:
+                errors = e.details.get('writeErrors', [])
+                if all(error.get('code') == DUPLICATE_KEY for error in errors):
+                    # Stored by a previous attempt
+                    self.inserted += len(documents)
+                    return True
+                print(f"Error inserting violations (attempt {attempt}): {str(e)}")
+            except PyMongoError as e:
+                print(f"Error inserting violations (attempt {attempt}): {str(e)}")
+            time.sleep(delay)
+            delay *= 2
+
+        self.dropped += len(documents)
+        print(f"Dropped {len(documents)} violations after {self.max_retries} attempts")
+        return False
+
+
+def get_violation_sink():
+    """Return the shared violation sink, creating it on first use."""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = ViolationSink()
+        return _sink
@@ -1,29 +1,65 @@
 from ultralytics import YOLO
 import cv2
-import easyocr
 import numpy as np
 from datetime import datetime
 import os
 import threading
+from bson.objectid import ObjectId
 from models.database import Database
-from utils.email_sender import EmailSender
+from utils.email_queue import get_email_queue
+from utils.digest import get_violation_digest
+from utils.ocr_engine import get_ocr_engine
+from utils.ocr_cache import PlateOCRCache
+from utils.progress import update_progress
+from utils.rollups import set_image_exists
+from utils.violation_sink import get_violation_sink
+from utils.mongo_pool import get_violation_log
 from sort import Sort
-import pymongo
+from frame_pipeline import FramePipeline, batched
+from frame_scheduler import AdaptiveFrameScheduler
+from frame_source import FrameSource, PrefetchingFrameReader
 from backend.models.vehicle_detection import VehicleDetection
-from models.violation_log import ViolationLog
 
 class VideoProcessor:
-    def __init__(self, detector=None):
+    def __init__(self, detector=None, load_models=True, model_server=None, record=True):
         self.frame_rate = 30
         self.pixels_per_meter = 100
-        self.previous_positions = {}
         self.speed_limit = 45
         self.min_speed = 5  # Minimum detectable speed in km/h
         self.confidence_threshold = 0.9  # 85% confidence threshold
-        self.vehicle_tracking = {}
-        self.previous_positions = {}
-        self.detection_db = VehicleDetection()
-        self.violation_log = ViolationLog()
+        self.vehicle_tracking = {}  # SORT track ID -> plate and position state
+        self.track_max_age = 3  # Sampled frames a track may go unseen before it finishes
+        self.plate_improvement = 1.1  # Re-read a plate only if the crop is 10% larger
+        self.detection_db = None
+        self.violation_log = None
+        self.violation_sink = None
+        self.email_queue = None
+        self.digest = None
+        if record:
+            # Only analyse_segment works without these (record=False)
+            self.detection_db = VehicleDetection()
+            self.violation_log = get_violation_log()
+            self.violation_sink = get_violation_sink()  # Database writes happen off the frame threads
+            self.email_queue = get_email_queue()  # Owner notifications are sent in the background
+            self.digest = get_violation_digest()  # Groups notifications per owner, if enabled
+        self.ocr = get_ocr_engine()  # Shared, warm-loaded EasyOCR readers
+        self.ocr_cache = PlateOCRCache()  # Readings reused across sampled frames
+        self.pipeline_queue_size = 8  # Max frame batches waiting between two stages
+        self.batch_size = 4  # Sampled frames sent to the vehicle model in one call
+        self.max_crop_batch = 64  # Vehicle crops sent to the plate model in one call
+        self.seek_threshold = 30  # Skips this long seek to a keyframe instead of grabbing
+        self.prefetch_frames = 16  # Decoded frames buffered ahead of the detection stage
+        self.model_server = model_server
+        
+        if not load_models:
+            # Only used to save and report detections made elsewhere
+            return
+        
+        if model_server is not None:
+            # Inference runs in the shared model server; keep the model names
+            self.vehicle_model = 'vehicle'
+            self.plate_model = 'plate'
+            return
         
         # Load YOLOv8 models
         self.vehicle_model = YOLO('yolov8n.pt')
@@ -32,144 +68,18 @@ class VideoProcessor:
 
     def process_video(self, filepath, status_dict, min_confidence=0.3):
         try:
-            cap = cv2.VideoCapture(filepath)
-            if not cap.isOpened():
-                raise Exception("Error opening video file")
-
-            self.frame_rate = self.get_frame_rate(cap)
-            frame_count = 0
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            db = Database()
+            source = self.open_video(filepath)
+            total_frames = source.total_frames
+            self.prepare_sink(status_dict, total_frames)
             
             print("\n=== Starting Video Processing ===")
-            print(f"Frame Size: {int(cap.get(3))}x{int(cap.get(4))}")
+            print(f"Frame Size: {source.width}x{source.height}")
             print(f"Total Frames: {total_frames}")
             print(f"Frame Rate: {self.frame_rate} fps")
             print("\nProcessing frames for vehicle detection and speed calculation...\n")
 
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                frame_count += 1
-                if frame_count % 5 != 0:  # Process every 5th frame
-                    continue
-
-                # Calculate and display progress
-                remaining_frames = total_frames - frame_count
-                progress_percent = (frame_count / total_frames) * 100
-                print(f"\rProcessing: {frame_count}/{total_frames} frames ({progress_percent:.1f}%) | Remaining: {remaining_frames} frames", end="")
-
-                processed_frame, detections = self.detect_license_plate(frame, frame_count)
-                
-                # Clear previous line and print frame processing status
-                print('\033[K', end='\r')  # Clear line
-                print(f"\r[Frame {frame_count}/{total_frames}] Processing... ", end="")
-                
-                if detections:
-                    for detection in detections:
-                        license_plate = detection.get('license_plate')
-                        speed = detection.get('speed', 0)
-                        confidence = detection.get('confidence', 0)
-                        bbox = detection.get('bbox', [])
-                        
-                        if confidence >= self.confidence_threshold and speed >= self.min_speed:
-                            # Use colors for better visibility
-                            is_violation = speed > self.speed_limit
-                            color = '\033[91m' if is_violation else '\033[92m'  # Red for violation, Green for normal
-                            reset = '\033[0m'
-                            
-                            print(f"\n\n{color}🚗 Vehicle Detection [Frame {frame_count}]{reset}")
-                            print(f"{color}├── Coordinates: (x={bbox[0]:.1f}, y={bbox[1]:.1f}){reset}")
-                            print(f"{color}├── Dimensions: (w={bbox[2]:.1f}, h={bbox[3]:.1f}){reset}")
-                            print(f"{color}├── License Plate: {license_plate} (Confidence: {confidence:.2%}){reset}")
-                            print(f"{color}└── Speed: {speed:.1f} km/h{reset}")
-                            
-                            if is_violation:
-                                print(f"\n{color}⚠️  SPEED VIOLATION DETECTED!{reset}")
-                                print(f"{color}    Speed: {speed:.1f} km/h (Limit: {self.speed_limit} km/h){reset}")
-                                
-                                # Save violation image
-                                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                                image_path = f"static/violations/{timestamp}.jpg"
-                                cv2.imwrite(image_path, processed_frame)
-                                print(f"    📸 Violation image saved: {image_path}")
-                                
-                                # Log violation in database
-                                violation_data = {
-                                    'license_plate': license_plate,
-                                    'speed': speed,
-                                    'confidence': confidence,
-                                    'timestamp': datetime.now(),
-                                    'image_path': image_path,
-                                    'status': 'Violation',
-                                    'coordinates': {
-                                        'x': bbox[0],
-                                        'y': bbox[1],
-                                        'width': bbox[2],
-                                        'height': bbox[3]
-                                    }
-                                }
-                                violation_id = db.save_violation(license_plate, speed, image_path)
-                                
-                                # Update MongoDB directly to ensure real-time updates
-                                mongo_client = pymongo.MongoClient('mongodb://localhost:27017/')
-                                db_traffic = mongo_client['traffic_monitoring']
-                                db_traffic.violations.insert_one(violation_data)
-                                mongo_client.close()
-                                
-                                print(f"    💾 Violation logged with ID: {violation_id}")
-                                print("    ----------------------------------------")
-                                
-                                if 'violations' not in status_dict:
-                                    status_dict['violations'] = []
-                                status_dict['violations'].append(violation_data)
-                                
-                                # Get vehicle owner and send email notification
-                                owner = db.get_vehicle_owner(license_plate)
-                                if owner and 'email' in owner:
-                                    try:
-                                        violation_data = {
-                                            'license_plate': license_plate,
-                                            'speed': speed,
-                                            'timestamp': datetime.now(),
-                                            'owner_email': owner['email'],
-                                            'fine_amount': violation_data.get('fine_amount', 0)
-                                        }
-                                        EmailSender.send_violation_notification(violation_data)
-                                        print(f"📧 Violation notification sent to: {owner['email']}")
-                                        db.save_email_notification(violation_id, owner['email'], 'sent')
-                                    except Exception as e:
-                                        print(f"Error sending email notification: {str(e)}")
-                                        db.save_email_notification(violation_id, owner['email'], 'failed')
-                    
-                    status_dict['detections'] = detections
-                    print("\n🚗 Vehicle Detection:")
-                    print(f"• License Plate: {detection['license_plate']}")
-                    print(f"• Speed: {detection['speed']:.1f} km/h")
-                    if detection['speed'] > self.speed_limit:
-                        print(f"⚠️ SPEED VIOLATION! Limit: {self.speed_limit} km/h")
-                        self.save_violation(detection['license_plate'], detection['speed'], frame)
-
-                # Try to display frame, but don't crash if display is not available
-                try:
-                    cv2.imshow('Speed Detection', processed_frame)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        break
-                except Exception as e:
-                    # Silently continue if display fails
-                    pass
-
-                processed_frames = frame_count
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                status_dict.update({
-                    'progress': int((processed_frames / total_frames) * 100),
-                    'frames_processed': processed_frames
-                })
-
-            cap.release()
-            cv2.destroyAllWindows()
+            self.run_pipeline(source, self.sink_stage)
+            self.violation_sink.flush()
             print("\n=== Video Processing Complete ===\n")
             
             # Display summary of all detections
@@ -205,6 +115,11 @@ class VideoProcessor:
             else:
                 print("No vehicles detected in this video.\n")
             
+            ocr_stats = self.ocr.stats()
+            print(f"OCR: {ocr_stats['calls']} calls, avg {ocr_stats['avg_latency'] * 1000:.1f} ms, "
+                  f"max {ocr_stats['max_latency'] * 1000:.1f} ms (load {ocr_stats['load_time']:.2f}s), "
+                  f"{self.ocr_cache.hits} cache hits\n")
+            
             print("=== End of Processing ===\n")
             return True
 
@@ -212,99 +127,478 @@ class VideoProcessor:
             print(f"Error in process_video: {str(e)}")
             return False
 
-    def detect_and_process_frame(self, frame):
-        # Detect vehicles using YOLOv8
-        vehicle_results = self.vehicle_model(frame)
-        
-        plate_img = None
-        plate_text = None
-        speed = 0
-        
-        # Process each detected vehicle
-        for vehicle_box in vehicle_results[0].boxes.xyxy:
-            x1, y1, x2, y2 = map(int, vehicle_box[:4].tolist())
-            vehicle_img = frame[y1:y2, x1:x2]
-            
-            # Draw vehicle bounding box
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            
-            # Detect license plate in vehicle region
-            plate_results = self.plate_model(vehicle_img)
-            
-            if len(plate_results[0].boxes) > 0:
-                # Get the first detected license plate
-                plate_box = plate_results[0].boxes.xyxy[0]
-                px1, py1, px2, py2 = map(int, plate_box[:4].tolist())
-                
-                # Extract license plate image
-                plate_img = vehicle_img[py1:py2, px1:px2]
-                
-                # Process plate image for OCR
-                plate_gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
-                _, plate_thresh = cv2.threshold(plate_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                
-                try:
-                    # Use EasyOCR for better accuracy
-                    reader = easyocr.Reader(['en'])
-                    plate_text = reader.readtext(plate_thresh, detail=0)
-                    plate_text = ''.join(plate_text).replace(' ', '').upper()
-                    
-                    if len(plate_text) >= 6 and '-' in plate_text:
-                        plate_text = plate_text.replace('|', '').replace('_', '').strip()
-                        centroid = (x1 + (x2-x1)//2, y1 + (y2-y1)//2)
-                        
-                        # Calculate speed
-                        if plate_text in self.previous_positions:
-                            prev_pos = self.previous_positions[plate_text]
-                            pixel_distance = np.sqrt((centroid[0] - prev_pos[0])**2 + (centroid[1] - prev_pos[1])**2)
-                            time_diff = 5 / self.frame_rate  # 5 frames between detections
-                            speed = (pixel_distance * 3.6) / (time_diff * self.pixels_per_meter)
-                            
-                            # Draw speed and plate info
-                            is_violation = speed > self.speed_limit
-                            color = (0, 0, 255) if is_violation else (0, 255, 0)  # Red for violation, Green for normal
-                            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
-                            
-                            # Add text background for better visibility
-                            text = f"{plate_text} {speed:.1f}km/h"
-                            (text_width, text_height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.75, 2)
-                            cv2.rectangle(frame, (x1, y1 - text_height - 10), (x1 + text_width + 10, y1), color, -1)
-                            cv2.putText(frame, text, (x1 + 5, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 255, 255), 2)
-                            
-                            if is_violation:
-                                warning_text = "SPEED VIOLATION!"
-                                cv2.putText(frame, warning_text, (x1, y1 - text_height - 15), 
-                                           cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0, 0, 255), 2)
-                        
-                        self.previous_positions[plate_text] = centroid
-                        return plate_img, plate_text, speed
-                except Exception as e:
-                    print(f"OCR Error: {str(e)}")
-                    continue
-        
-        return None, None, 0
+    def open_video(self, filepath, start_frame=1):
+        """Open a video and reset the tracking state for a new run."""
+        source = FrameSource(filepath, seek_threshold=self.seek_threshold)
+        if start_frame > 1:
+            source.seek(start_frame)
+        self.frame_rate = source.fps
+        self.tracker = Sort(max_age=self.track_max_age, min_hits=1, iou_threshold=0.2)
+        self.vehicle_tracking = {}
+        self.sample_index = 0
+        self.last_frame_count = 0
+        self.scheduler = AdaptiveFrameScheduler()
+        # Decode ahead on a background thread into reused frame buffers;
+        # a batch needs all its frames at once, so never fewer buffers
+        self.reader = PrefetchingFrameReader(
+            source,
+            buffer_size=max(self.prefetch_frames, self.batch_size + 2),
+            stride=lambda: self.scheduler.stride,
+            auto_release=False
+        )
+        return source
 
-    def get_frame_rate(self, cap):
-        """Get the frame rate of the video capture."""
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        return fps if fps > 0 else 30.0  # Default to 30 fps if unable to determine
+    def prepare_sink(self, status_dict, total_frames):
+        """Set up the state handle_frame reports and saves detections with."""
+        self.total_frames = total_frames
+        self.db = Database()
+        self.status_dict = status_dict
 
-    def detect_license_plate(self, frame, frame_count):
-        # Process frame using detect_and_process_frame
-        plate_img, plate_text, speed = self.detect_and_process_frame(frame)
-        
+    def run_pipeline(self, source, sink_stage, end_frame=None):
+        """Process an opened video up to end_frame, handing frame jobs to sink_stage."""
+        # Decode, vehicle detection, plate reading and the DB/image/email
+        # work each run on their own thread, joined by bounded queues
+        self.pipeline = FramePipeline(
+            batched(self.read_frames(self.reader, end_frame), self.batch_size),
+            [self.detection_stage, (self.plate_stage, self.flush_tracks), sink_stage],
+            queue_size=self.pipeline_queue_size,
+            on_drop=self.release_batch,
+            on_stop=self.reader.stop
+        )
+        try:
+            self.pipeline.run()
+        finally:
+            self.reader.stop()
+            source.release()
+            cv2.destroyAllWindows()
+
+    def analyse_segment(self, filepath, start_frame, end_frame):
+        """Detect and track vehicles in frames start_frame..end_frame without saving anything.
+
+        Used by sharded processing: returns the finished-track detections,
+        with their evidence image JPEG-encoded so it can leave the process.
+        """
         detections = []
-        if plate_text and speed > 0:
-            # Create detection object with confidence threshold
-            detection = {
-                'license_plate': plate_text,
+
+        def collect_stage(batch):
+            try:
+                for job in batch:
+                    for detection in job['detections']:
+                        image = detection.pop('image', None)
+                        if image is None:
+                            image = job['frame']
+                        detection['image'] = cv2.imencode('.jpg', image)[1].tobytes() if image is not None else None
+                        detections.append(detection)
+            finally:
+                self.release_batch(batch)
+
+        source = self.open_video(filepath, start_frame)
+        self.run_pipeline(source, collect_stage, end_frame)
+        return detections
+
+    def read_frames(self, reader, end_frame=None):
+        """Decode stage: yield the frames picked by the adaptive scheduler as frame jobs.
+
+        The stride follows scene motion, the number of active tracks and the
+        pipeline backlog; speeds use the real frame gap between samples.
+        Frames in between are only grabbed, never decoded. Each job's frame
+        buffer goes back to the reader once the sink is done with it.
+        """
+        for frame_count, timestamp, frame in reader:
+            if end_frame is not None and frame_count > end_frame:
+                reader.release(frame_count)
+                break
+            detect, stride = self.scheduler.schedule(
+                frame, active_tracks=len(self.vehicle_tracking), lag=self.pipeline.backlog()
+            )
+            if detect:
+                yield {'frame_count': frame_count, 'timestamp': timestamp, 'frame': frame}
+            else:
+                reader.release(frame_count)
+
+    def detection_stage(self, batch):
+        """Run the vehicle model once for a whole batch and track the vehicles."""
+        frames = [job['frame'] for job in batch]
+        for job, vehicle_boxes in zip(batch, self.predict_boxes(self.vehicle_model, frames)):
+            job['tracks'] = self.track_vehicles(job['frame'], vehicle_boxes)
+        return batch
+
+    def track_vehicles(self, frame, vehicle_boxes):
+        """Associate vehicle boxes with SORT tracks; returns [(track_id, box)]."""
+        if vehicle_boxes:
+            dets = np.array([[x1, y1, x2, y2, 1.0] for x1, y1, x2, y2 in vehicle_boxes], dtype=float)
+        else:
+            dets = np.empty((0, 5))
+
+        height, width = frame.shape[:2]
+        tracks = []
+        for x1, y1, x2, y2, track_id in self.tracker.update(dets):
+            x1, x2 = int(np.clip(x1, 0, width)), int(np.clip(x2, 0, width))
+            y1, y2 = int(np.clip(y1, 0, height)), int(np.clip(y2, 0, height))
+            if x2 > x1 and y2 > y1:
+                tracks.append((int(track_id), (x1, y1, x2, y2)))
+        return tracks
+
+    def plate_stage(self, batch):
+        """Read plates, update tracks and finish lost tracks for a batch of frame jobs.
+
+        The plate model sees the crops of every track in the batch at once,
+        except tracks whose plate reading has already settled.
+        """
+        crops = []
+        owners = []
+        for job in batch:
+            for track_id, (x1, y1, x2, y2) in job['tracks']:
+                if self.ocr_cache.stable_reading(track_id) is None:
+                    crops.append(job['frame'][y1:y2, x1:x2])
+                    owners.append((job['frame_count'], track_id))
+
+        plate_boxes = {}
+        for start in range(0, len(crops), self.max_crop_batch):
+            chunk = crops[start:start + self.max_crop_batch]
+            chunk_boxes = self.predict_boxes(self.plate_model, chunk)
+            plate_boxes.update(zip(owners[start:start + self.max_crop_batch], chunk_boxes))
+
+        for job in batch:
+            job['detections'] = self.update_tracks(job, plate_boxes)
+        return batch
+
+    def flush_tracks(self):
+        """Finish every track still open at the end of the video."""
+        detections = [self.finish_track(track_id) for track_id in list(self.vehicle_tracking)]
+        detections = [detection for detection in detections if detection]
+        if not detections:
+            return None
+        return [{'frame_count': self.last_frame_count, 'frame': None, 'detections': detections}]
+
+    def update_tracks(self, job, plate_boxes):
+        """Fold one sampled frame into the track state.
+
+        Returns the detections of tracks that finished, i.e. have not been
+        seen for more than track_max_age sampled frames.
+        """
+        frame = job['frame']
+        frame_count = job['frame_count']
+        self.sample_index += 1
+        self.last_frame_count = frame_count
+
+        for track_id, box in job['tracks']:
+            x1, y1, x2, y2 = box
+            position = (frame_count, (x1 + (x2-x1)//2, y1 + (y2-y1)//2))
+            track = self.vehicle_tracking.get(track_id)
+            if track is None:
+                track = self.vehicle_tracking[track_id] = {
+                    'track_id': track_id,
+                    'first_position': position,
+                    'previous_position': position,
+                    'plate_text': None,
+                    'plate_confidence': 0.0,
+                    'plate_score': 0,
+                    'snapshot': None
+                }
+            track['previous_position'] = track.get('last_position', position)
+            track['last_position'] = position
+            track['last_sample'] = self.sample_index
+            track['bbox'] = box
+
+            vehicle_plates = plate_boxes.get((frame_count, track_id))
+            plate_read = bool(vehicle_plates) and self.update_plate(track, frame, box, vehicle_plates[0])
+            self.draw_track(frame, track)
+            if plate_read:
+                # Keep the annotated frame of the best plate view as evidence
+                track['snapshot'] = frame.copy()
+
+        finished = [track_id for track_id, track in self.vehicle_tracking.items()
+                    if self.sample_index - track['last_sample'] > self.track_max_age]
+        detections = [self.finish_track(track_id) for track_id in finished]
+        return [detection for detection in detections if detection]
+
+    def update_plate(self, track, frame, box, plate_box):
+        """OCR a track's plate, but only when this crop beats its best one so far.
+
+        Returns True when the track got a new valid reading.
+        """
+        x1, y1, x2, y2 = box
+        px1, py1, px2, py2 = plate_box
+        plate_img = frame[y1:y2, x1:x2][py1:py2, px1:px2]
+        if plate_img.size == 0:
+            return False
+
+        score = plate_img.shape[0] * plate_img.shape[1]
+        if score <= track['plate_score'] * self.plate_improvement:
+            return False
+        track['plate_score'] = score
+
+        # Process plate image for OCR
+        plate_gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
+        _, plate_thresh = cv2.threshold(plate_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        try:
+            plate_text, confidence = self.read_plate_text(plate_thresh, track['track_id'])
+        except Exception as e:
+            print(f"OCR Error: {str(e)}")
+            return False
+
+        if len(plate_text) >= 6 and '-' in plate_text:
+            track['plate_text'] = plate_text
+            track['plate_confidence'] = confidence
+            return True
+        return False
+
+    def draw_track(self, frame, track):
+        """Draw a track's box, plate and current speed on the frame."""
+        x1, y1, x2, y2 = track['bbox']
+        speed = self.speed_between(track['previous_position'], track['last_position'])
+        is_violation = speed > self.speed_limit
+        color = (0, 0, 255) if is_violation else (0, 255, 0)  # Red for violation, Green for normal
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3 if track['plate_text'] else 2)
+
+        if not track['plate_text']:
+            return
+
+        # Add text background for better visibility
+        text = f"{track['plate_text']} {speed:.1f}km/h"
+        (text_width, text_height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.75, 2)
+        cv2.rectangle(frame, (x1, y1 - text_height - 10), (x1 + text_width + 10, y1), color, -1)
+        cv2.putText(frame, text, (x1 + 5, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 255, 255), 2)
+
+        if is_violation:
+            warning_text = "SPEED VIOLATION!"
+            cv2.putText(frame, warning_text, (x1, y1 - text_height - 15),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0, 0, 255), 2)
+
+    def finish_track(self, track_id):
+        """Attach the final plate reading and speed to a track that has left the scene."""
+        track = self.vehicle_tracking.pop(track_id)
+        stable = self.ocr_cache.stable_reading(track_id)
+        self.ocr_cache.forget(track_id)
+
+        if stable is not None:
+            plate_text, ocr_confidence = stable
+        else:
+            plate_text, ocr_confidence = track['plate_text'], track['plate_confidence']
+        speed = self.speed_between(track['first_position'], track['last_position'])
+        if not plate_text or speed <= 0:
+            return None
+
+        x1, y1, x2, y2 = track['bbox']
+        return {
+            'license_plate': plate_text,
+            'speed': speed,
+            'confidence': 0.9,  # High confidence for successful detections
+            'ocr_confidence': ocr_confidence,
+            'bbox': [x1, y1, x2 - x1, y2 - y1],
+            'track_id': track_id,
+            'first_frame': track['first_position'][0],
+            'last_frame': track['last_position'][0],
+            'image': track['snapshot']
+        }
+
+    def speed_between(self, start, end):
+        """Average speed in km/h between two (frame_count, centroid) positions."""
+        (start_frame, start_point), (end_frame, end_point) = start, end
+        if end_frame <= start_frame:
+            return 0
+        pixel_distance = np.sqrt((end_point[0] - start_point[0])**2 + (end_point[1] - start_point[1])**2)
+        time_diff = (end_frame - start_frame) / self.frame_rate
+        return (pixel_distance * 3.6) / (time_diff * self.pixels_per_meter)
+
+    def sink_stage(self, batch):
+        """Report detections and save violations for a batch of frame jobs."""
+        try:
+            for job in batch:
+                self.handle_frame(job)
+        finally:
+            self.release_batch(batch)
+
+    def release_batch(self, batch):
+        """Give the frame buffers of a batch of frame jobs back to the reader."""
+        for job in batch:
+            if job.get('frame') is not None:
+                self.reader.release(job['frame_count'])
+
+    def handle_frame(self, job):
+        """Report detections and save violations for a processed frame job."""
+        status_dict = self.status_dict
+        frame_count = job['frame_count']
+        total_frames = self.total_frames
+        processed_frame = job['frame']
+        detections = job['detections']
+
+        # Calculate and display progress
+        remaining_frames = total_frames - frame_count
+        progress_percent = (frame_count / total_frames) * 100
+        print(f"\rProcessing: {frame_count}/{total_frames} frames ({progress_percent:.1f}%) | Remaining: {remaining_frames} frames", end="")
+
+        # Clear previous line and print frame processing status
+        print('\033[K', end='\r')  # Clear line
+        print(f"\r[Frame {frame_count}/{total_frames}] Processing... ", end="")
+        
+        if detections:
+            for detection in detections:
+                # Finished tracks carry the frame of their best plate view
+                evidence = detection.pop('image', None)
+                if evidence is None:
+                    evidence = processed_frame
+                license_plate = detection.get('license_plate')
+                speed = detection.get('speed', 0)
+                confidence = detection.get('confidence', 0)
+                bbox = detection.get('bbox', [])
+
+                if confidence >= self.confidence_threshold and speed >= self.min_speed:
+                    # Use colors for better visibility
+                    is_violation = speed > self.speed_limit
+                    color = '\033[91m' if is_violation else '\033[92m'  # Red for violation, Green for normal
+                    reset = '\033[0m'
+
+                    print(f"\n\n{color}🚗 Vehicle Detection [Frame {frame_count}]{reset}")
+                    print(f"{color}├── Coordinates: (x={bbox[0]:.1f}, y={bbox[1]:.1f}){reset}")
+                    print(f"{color}├── Dimensions: (w={bbox[2]:.1f}, h={bbox[3]:.1f}){reset}")
+                    print(f"{color}├── License Plate: {license_plate} (Confidence: {confidence:.2%}){reset}")
+                    print(f"{color}└── Speed: {speed:.1f} km/h{reset}")
+
+                    if is_violation:
+                        print(f"\n{color}⚠️  SPEED VIOLATION DETECTED!{reset}")
+                        print(f"{color}    Speed: {speed:.1f} km/h (Limit: {self.speed_limit} km/h){reset}")
+
+                        # Save violation image; finished tracks arrive in bursts,
+                        # so the violation's own id keeps the file name unique
+                        violation_id = ObjectId()
+                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                        image_path = f"static/violations/{timestamp}_{violation_id}.jpg"
+                        image_saved = cv2.imwrite(image_path, evidence)
+                        print(f"    📸 Violation image saved: {image_path}")
+
+                        # Log violation in database
+                        violation_data = {
+                            '_id': violation_id,
+                            'license_plate': license_plate,
+                            'speed': speed,
+                            'confidence': confidence,
+                            'timestamp': datetime.now(),
+                            'image_path': image_path,
+                            'image_exists': bool(image_saved),
+                            'status': 'Violation',
+                            'coordinates': {
+                                'x': bbox[0],
+                                'y': bbox[1],
+                                'width': bbox[2],
+                                'height': bbox[3]
+                            }
+                        }
+                        # Stored in batches by the sink thread, for real-time updates
+                        violation_id = self.violation_sink.add(violation_data)
+                        # The legacy record and the owner notification are written there too
+                        self.violation_sink.defer(self.notify_violation, license_plate, speed, image_path,
+                                                  violation_data.get('fine_amount', 0), bool(image_saved))
+
+                        print(f"    💾 Violation queued with ID: {violation_id}")
+                        print("    ----------------------------------------")
+
+                        if 'violations' not in status_dict:
+                            status_dict['violations'] = []
+                        status_dict['violations'].append(violation_data)
+
+            status_dict.setdefault('detections', []).extend(detections)
+            print("\n🚗 Vehicle Detection:")
+            print(f"• License Plate: {detection['license_plate']}")
+            print(f"• Speed: {detection['speed']:.1f} km/h")
+            if detection['speed'] > self.speed_limit:
+                print(f"⚠️ SPEED VIOLATION! Limit: {self.speed_limit} km/h")
+                self.save_violation(detection['license_plate'], detection['speed'], evidence)
+
+        # Try to display frame, but don't crash if display is not available
+        if processed_frame is not None:
+            try:
+                cv2.imshow('Speed Detection', processed_frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    self.pipeline.stop()
+            except Exception as e:
+                # Silently continue if display fails
+                pass
+
+        # The job scheduler sets this flag when the job is cancelled
+        if status_dict.get('cancelled') and getattr(self, 'pipeline', None) is not None:
+            self.pipeline.stop()
+
+        processed_frames = frame_count
+        update_progress(status_dict, int((processed_frames / total_frames) * 100),
+                        frames_processed=processed_frames)
+
+    def notify_violation(self, license_plate, speed, image_path, fine_amount=0, image_exists=None):
+        """Record a violation and queue the owner's email (runs on the violation sink thread)."""
+        db = self.db
+        violation_id = db.save_violation(license_plate, speed, image_path)
+        print(f"    💾 Violation logged with ID: {violation_id}")
+        # Store whether its image was saved, so /violations never checks disk
+        if image_exists is not None:
+            set_image_exists(violation_id, image_exists)
+
+        # Get vehicle owner and send email notification
+        owner = db.get_vehicle_owner(license_plate)
+        if owner and 'email' in owner:
+            violation_data = {
+                'license_plate': license_plate,
                 'speed': speed,
-                'confidence': 0.9,  # High confidence for successful detections
-                'bbox': [0, 0, frame.shape[1], frame.shape[0]]  # Full frame as bbox
+                'timestamp': datetime.now(),
+                'owner_email': owner['email'],
+                'fine_amount': fine_amount
             }
-            detections.append(detection)
-        
-        return frame, detections
+            if self.digest is not None:
+                self.digest.add(violation_data, violation_id, image_path)
+            else:
+                # The queue records the outcome in email_notifications
+                self.email_queue.send_violation_notification(violation_data, violation_id, image_path)
+                print(f"📧 Violation notification queued for: {owner['email']}")
+
+    def detect_vehicles(self, frame):
+        """Detect vehicles using YOLOv8 and return their xyxy boxes."""
+        return self.predict_boxes(self.vehicle_model, [frame])[0]
+
+    def predict_boxes(self, model, images):
+        """Run a YOLO model on a list of images in a single call.
+
+        Returns one list of integer (x1, y1, x2, y2) boxes per input image.
+        Empty crops are skipped instead of being sent to the model.
+        """
+        if self.model_server is not None:
+            return self.model_server.predict_boxes(model, images)
+
+        boxes = [[] for _ in images]
+        valid = [i for i, image in enumerate(images) if image is not None and image.size > 0]
+        if not valid:
+            return boxes
+
+        results = model([images[i] for i in valid], verbose=False)
+        for i, result in zip(valid, results):
+            boxes[i] = [tuple(map(int, box[:4].tolist())) for box in result.boxes.xyxy]
+        return boxes
+
+    def read_plate_text(self, plate_thresh, track_id=None):
+        """OCR a thresholded plate crop, reusing earlier readings when possible.
+
+        Returns (text, confidence). A track that has settled on a reading, or
+        a crop that hashes like one read before, never reaches EasyOCR.
+        """
+        if track_id is not None:
+            stable = self.ocr_cache.stable_reading(track_id)
+            if stable is not None:
+                return stable
+
+        key = self.ocr_cache.key(track_id, plate_thresh)
+        cached = self.ocr_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Use EasyOCR for better accuracy
+        results = self.ocr.readtext(plate_thresh)
+        text = ''.join(result[1] for result in results).replace(' ', '').upper()
+        text = text.replace('|', '').replace('_', '').strip()
+        confidence = float(np.mean([result[2] for result in results])) if results else 0.0
+
+        # Only readings that look like a plate count towards a track's vote
+        self.ocr_cache.put(key, text, confidence, vote=len(text) >= 6 and '-' in text)
+        return text, confidence
 
     def save_violation(self, license_plate, speed, frame):
         """Save violation details and image."""
@@ -312,9 +606,9 @@ class VideoProcessor:
             # Create violations directory if it doesn't exist
             os.makedirs('static/violations', exist_ok=True)
             
-            # Generate timestamp and save violation image
+            # Generate timestamp and save violation image, unique within the second
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            image_path = f"static/violations/{timestamp}.jpg"
+            image_path = f"static/violations/{timestamp}_{ObjectId()}.jpg"
             cv2.imwrite(image_path, frame)
             
             # Log violation in database
@@ -324,7 +618,7 @@ class VideoProcessor:
                 'timestamp': datetime.now(),
                 'image_path': image_path
             }
-            self.violation_log.add_violation(violation_data)
+            self.violation_sink.defer(self.violation_log.add_violation, violation_data)
             
             return True
         except Exception as e:
@@ -0,0 +1,192 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from frame_source import FrameSource
+from utils.progress import update_progress
+
+# VideoProcessor of a worker process, loaded once by _init_worker
+_processor = None
+
+
+def split_segments(total_frames, fps, segment_seconds=120, overlap_seconds=2):
+    """Split frames 1..total_frames into (start, end) segments.
+
+    Every segment but the first also covers the last overlap_seconds of the
+    previous one, so a vehicle crossing a boundary is fully seen at least once.
+    """
+    length = max(1, int(segment_seconds * fps))
+    overlap = int(overlap_seconds * fps)
+    segments = []
+    start = 1
+    while start <= total_frames:
+        end = min(total_frames, start + length - 1)
+        segments.append((max(1, start - overlap) if segments else start, end))
+        start = end + 1
+    return segments
+
+
+def _init_worker(threads):
+    """Load the models once per worker process."""
+    global _processor
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    cv2.setNumThreads(threads)
+
+    from utils.ocr_engine import get_ocr_engine
+    from video_processor import VideoProcessor
+
+    # One reader is enough: a worker processes a single segment at a time
+    get_ocr_engine(1)
+    # Segments are only analysed here: no database clients, sink or email queue
+    _processor = VideoProcessor(record=False)
+
+
+def _process_segment(args):
+    filepath, start_frame, end_frame = args
+    return _processor.analyse_segment(filepath, start_frame, end_frame)
+
+
+def _similar_plates(a, b):
+    """Same plate, allowing for a single misread character."""
+    if a == b:
+        return True
+    if len(a) != len(b):
+        return False
+    return sum(1 for x, y in zip(a, b) if x != y) <= 1
+
+
+def merge_segment_detections(segment_detections):
+    """Merge the detections of all segments, dropping boundary duplicates.
+
+    A vehicle in the overlap of two segments is tracked by both. Two
+    detections from different segments are the same vehicle when their
+    plates match (give or take one character) and their frame spans
+    overlap; the one tracked over more frames has the better speed estimate
+    and is kept.
+    """
+    merged = []
+    for index, detections in enumerate(segment_detections):
+        for detection in detections:
+            detection['segment'] = index
+            duplicate = None
+            for kept in merged:
+                if (kept['segment'] != index
+                        and detection['first_frame'] <= kept['last_frame']
+                        and kept['first_frame'] <= detection['last_frame']
+                        and _similar_plates(kept['license_plate'], detection['license_plate'])):
+                    duplicate = kept
+                    break
+
+            if duplicate is None:
+                merged.append(detection)
+            elif (detection['last_frame'] - detection['first_frame']
+                  > duplicate['last_frame'] - duplicate['first_frame']):
+                merged[merged.index(duplicate)] = detection
+
+    merged.sort(key=lambda detection: detection['last_frame'])
+    return merged
+
+
+class ShardedVideoProcessor:
+    """Process a long video as overlapping time segments on a pool of worker processes.
+
+    Every worker loads its own models and tracks its segments independently;
+    the parent merges the finished tracks and saves violations exactly like
+    VideoProcessor does. Videos shorter than min_sharded_seconds are not
+    worth the model loading and go through a single VideoProcessor instead.
+    """
+
+    def __init__(self, workers=None, segment_seconds=120, overlap_seconds=2,
+                 min_sharded_seconds=300):
+        self.workers = workers or os.cpu_count() or 1
+        self.segment_seconds = segment_seconds
+        self.overlap_seconds = overlap_seconds
+        self.min_sharded_seconds = min_sharded_seconds
+
+    def process_video(self, filepath, status_dict, min_confidence=0.3):
+        from video_processor import VideoProcessor
+
+        try:
+            with FrameSource(filepath) as source:
+                fps = source.fps
+                total_frames = source.total_frames
+
+            if self.workers < 2 or total_frames < self.min_sharded_seconds * fps:
+                return VideoProcessor().process_video(filepath, status_dict, min_confidence)
+
+            segments = split_segments(total_frames, fps, self.segment_seconds, self.overlap_seconds)
+            workers = min(self.workers, len(segments))
+            threads = max(1, (os.cpu_count() or 1) // workers)
+
+            print("\n=== Starting Sharded Video Processing ===")
+            print(f"Total Frames: {total_frames}")
+            print(f"Frame Rate: {fps} fps")
+            print(f"Segments: {len(segments)} on {workers} worker processes\n")
+
+            update_progress(status_dict, 0, frames_processed=0)
+            results = [None] * len(segments)
+            frames_done = 0
+
+            # Spawned workers do not inherit the parent's threads or CUDA state
+            context = multiprocessing.get_context('spawn')
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                       initializer=_init_worker, initargs=(threads,))
+            cancelled = False
+            try:
+                futures = {
+                    pool.submit(_process_segment, (filepath, start, end)): index
+                    for index, (start, end) in enumerate(segments)
+                }
+                for future in as_completed(futures):
+                    if status_dict.get('cancelled'):
+                        print("\nSharded processing cancelled")
+                        cancelled = True
+                        return True
+                    index = futures[future]
+                    start, end = segments[index]
+                    results[index] = future.result()
+                    frames_done += end - start + 1
+                    print(f"Segment {index + 1}/{len(segments)} done (frames {start}-{end}, "
+                          f"{len(results[index])} tracks)")
+                    update_progress(status_dict, min(99, int(frames_done / total_frames * 100)),
+                                    frames_processed=min(frames_done, total_frames))
+            finally:
+                # Segments not started yet are dropped if processing stops early;
+                # a cancel returns at once instead of waiting for the running ones
+                pool.shutdown(wait=not cancelled, cancel_futures=True)
+
+            detections = merge_segment_detections(results)
+            print(f"\nMerged {sum(len(r) for r in results)} tracks into {len(detections)} vehicles\n")
+
+            # Report and save the merged tracks with the regular sink
+            sink = VideoProcessor(load_models=False)
+            sink.frame_rate = fps
+            sink.prepare_sink(status_dict, total_frames)
+            progress = status_dict['progress']
+            for detection in detections:
+                image = detection.pop('image', None)
+                if image is not None:
+                    detection['image'] = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+                sink.handle_frame({
+                    'frame_count': detection['last_frame'],
+                    'frame': None,
+                    'detections': [detection]
+                })
+                # handle_frame reports progress by frame number; keep it monotonic
+                status_dict['progress'] = progress
+
+            sink.violation_sink.flush()
+            update_progress(status_dict, 100, frames_processed=total_frames)
+            print("\n=== Sharded Video Processing Complete ===\n")
+            return True
+
+        except Exception as e:
+            print(f"Error in sharded process_video: {str(e)}")
+            return False